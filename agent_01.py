@@ -1,17 +1,26 @@
 import json
 import asyncio
+import calendar
+import contextlib
+import contextvars
 import os
 import logging
+import threading
+import time
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any, Union
+from typing import AsyncIterator, Dict, List, Optional, Any, Tuple, Union
 from dataclasses import dataclass
 import requests
+import aiohttp
+from requests.adapters import HTTPAdapter
 from langchain_core.tools import tool
 from langgraph.graph import StateGraph, END
+from langgraph.config import get_stream_writer
 from langgraph.prebuilt import ToolNode
 import cohere
 from typing_extensions import TypedDict
 from dotenv import load_dotenv
+from caching import PersistentCache, SimilarityCache, SingleFlight, TTLCache
 
 load_dotenv()
 
@@ -34,6 +43,46 @@ class Config:
         if not self.OPENWEATHER_API_KEY:
             logger.warning("OPENWEATHER_API_KEY not found in environment variables")
             self.OPENWEATHER_API_KEY = "demo-key-replace-with-real"
+        
+        # Explanation generation limits: how many LLM calls may be in flight
+        # at once, and how long a single call may take before falling back
+        self.EXPLANATION_MAX_CONCURRENCY = int(os.getenv('EXPLANATION_MAX_CONCURRENCY', '3'))
+        self.EXPLANATION_TIMEOUT_SECONDS = float(os.getenv('EXPLANATION_TIMEOUT_SECONDS', '8'))
+        # "batch" explains every recommendation with one LLM call, "per_item" uses one call each
+        self.EXPLANATION_MODE = os.getenv('EXPLANATION_MODE', 'batch')
+        
+        # Weather cache: entries are fresh for the TTL, then served stale
+        # (while one background refresh runs) for up to the max stale age
+        self.WEATHER_CACHE_TTL_SECONDS = float(os.getenv('WEATHER_CACHE_TTL_SECONDS', '600'))
+        self.WEATHER_CACHE_MAX_STALE_SECONDS = float(os.getenv('WEATHER_CACHE_MAX_STALE_SECONDS', '3600'))
+        
+        # Festival foods only depend on (month, location), so they are kept in
+        # an SQLite file shared by all workers on the host and across restarts
+        self.FESTIVAL_CACHE_PATH = os.getenv(
+            'FESTIVAL_CACHE_PATH',
+            os.path.join(os.path.dirname(os.path.abspath(__file__)), 'festival_cache.db')
+        )
+        
+        # Trend analyses are shared between requests whose weather falls in the
+        # same condition class and temperature band, for up to the TTL
+        self.TRENDS_TEMP_BAND_C = max(1, int(os.getenv('TRENDS_TEMP_BAND_C', '5')))
+        self.TRENDS_CACHE_TTL_SECONDS = float(os.getenv('TRENDS_CACHE_TTL_SECONDS', '1800'))
+        
+        # Pooled keep-alive HTTP client for OpenWeatherMap
+        self.WEATHER_HTTP_POOL_SIZE = int(os.getenv('WEATHER_HTTP_POOL_SIZE', '10'))
+        self.WEATHER_CONNECT_TIMEOUT_SECONDS = float(os.getenv('WEATHER_CONNECT_TIMEOUT_SECONDS', '3'))
+        self.WEATHER_READ_TIMEOUT_SECONDS = float(os.getenv('WEATHER_READ_TIMEOUT_SECONDS', '7'))
+        
+        # End-to-end latency budget for a recommendation request when the
+        # caller does not send deadline_ms; 0 disables the deadline
+        self.REQUEST_DEADLINE_MS = int(os.getenv('REQUEST_DEADLINE_MS', '20000'))
+        
+        # Chat replies are reused for later messages in the same location whose
+        # normalized words overlap at least the threshold (Jaccard similarity)
+        self.CHAT_CACHE_SIMILARITY_THRESHOLD = float(os.getenv('CHAT_CACHE_SIMILARITY_THRESHOLD', '0.8'))
+        self.CHAT_CACHE_TTL_SECONDS = float(os.getenv('CHAT_CACHE_TTL_SECONDS', '600'))
+        self.CHAT_CACHE_MAX_ENTRIES = int(os.getenv('CHAT_CACHE_MAX_ENTRIES', '512'))
+        self.CHAT_CACHE_MAX_BYTES = int(os.getenv('CHAT_CACHE_MAX_BYTES', '2000000'))
     
     def is_demo_mode(self) -> bool:
         """Check if we're running in demo mode with fake keys"""
@@ -47,12 +96,17 @@ config = Config()
 try:
     if not config.is_demo_mode():
         co = cohere.Client(config.COHERE_API_KEY)
+        # Async client for the graph nodes; its connection pool belongs to
+        # the event loop that first uses it (the worker's persistent loop)
+        aco = cohere.AsyncClient(config.COHERE_API_KEY)
     else:
         co = None
+        aco = None
         logger.info("Running in demo mode - AI features will use fallback data")
 except Exception as e:
     logger.error(f"Failed to initialize Cohere client: {e}")
     co = None
+    aco = None
 
 # Data Models
 @dataclass
@@ -74,56 +128,202 @@ class AgentState(TypedDict):
     final_recommendations: Optional[List[Dict[str, Any]]]
     current_month: Optional[str]
     error_messages: Optional[List[str]]
+    deadline: Optional[float]  # time.monotonic() by which the pipeline must finish
+
+# Shared by every WeatherService in the process, keyed by normalized city name
+weather_cache = TTLCache(
+    ttl_seconds=config.WEATHER_CACHE_TTL_SECONDS,
+    max_stale_seconds=config.WEATHER_CACHE_MAX_STALE_SECONDS
+)
+# Concurrent cache misses for the same city share one OpenWeatherMap call
+weather_inflight = SingleFlight()
+
+def build_http_session(pool_size: int) -> requests.Session:
+    """requests session that keeps up to pool_size connections per host alive"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
 
 # Weather API Integration
 class WeatherService:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, cache: Optional[TTLCache] = None,
+                 session: Optional[requests.Session] = None):
         self.api_key = api_key
         self.base_url = "http://api.openweathermap.org/data/2.5/weather"
+        self.cache = cache if cache is not None else weather_cache
+        self.session = session if session is not None else build_http_session(config.WEATHER_HTTP_POOL_SIZE)
+        self.timeout = (config.WEATHER_CONNECT_TIMEOUT_SECONDS, config.WEATHER_READ_TIMEOUT_SECONDS)
+        # aiohttp sessions are bound to the loop that created them
+        self._async_session: Optional[aiohttp.ClientSession] = None
+        self._async_session_loop = None
+        self._refresh_tasks = set()
     
     def get_weather_data(self, location: str) -> Dict[str, Any]:
-        """Get real weather data from OpenWeatherMap API"""
+        """Get real weather data from OpenWeatherMap API, served from cache when possible"""
         if config.is_demo_mode():
             return self._get_demo_weather_data()
         
+        key = self._cache_key(location)
+        cached, status = self.cache.lookup(key)
+        if status == "fresh":
+            return dict(cached)
+        if status == "stale":
+            # Serve the stale value now and let one background refresh update it
+            if self.cache.begin_refresh(key):
+                threading.Thread(
+                    target=self._refresh_weather_data,
+                    args=(location, key),
+                    daemon=True
+                ).start()
+            return dict(cached)
+        
         try:
-            params = {
-                'q': location,
-                'appid': self.api_key,
-                'units': 'metric'
-            }
-            
-            response = requests.get(self.base_url, params=params, timeout=10)
-            response.raise_for_status()
-            
-            data = response.json()
-            
-            # Extract relevant weather information
-            weather_info = {
-                "condition": data['weather'][0]['main'].lower(),
-                "description": data['weather'][0]['description'],
-                "temperature": round(data['main']['temp']),
-                "feels_like": round(data['main']['feels_like']),
-                "humidity": data['main']['humidity'],
-                "city": data['name'],
-                "country": data['sys']['country']
-            }
-            
-            # Add food suggestions based on weather
-            weather_info["food_suggestions"] = self._get_weather_based_suggestions(
-                weather_info["condition"], 
-                weather_info["temperature"]
-            )
-            
-            logger.info(f"Successfully fetched weather for {location}: {weather_info['condition']}, {weather_info['temperature']}°C")
-            return weather_info
-            
+            weather_info = weather_inflight.do(key, self._fetch_weather_data, location)
         except requests.exceptions.RequestException as e:
             logger.error(f"Failed to fetch weather data: {e}")
             return self._get_fallback_weather_data(location)
         except KeyError as e:
             logger.error(f"Unexpected weather API response format: {e}")
             return self._get_fallback_weather_data(location)
+        
+        self.cache.set(key, weather_info)
+        return dict(weather_info)
+    
+    async def aget_weather_data(self, location: str) -> Dict[str, Any]:
+        """Async variant of get_weather_data that never blocks the event loop"""
+        if config.is_demo_mode():
+            return self._get_demo_weather_data()
+        
+        key = self._cache_key(location)
+        cached, status = self.cache.lookup(key)
+        if status == "fresh":
+            return dict(cached)
+        if status == "stale":
+            if self.cache.begin_refresh(key):
+                task = asyncio.ensure_future(self._arefresh_weather_data(location, key))
+                self._refresh_tasks.add(task)
+                task.add_done_callback(self._refresh_tasks.discard)
+            return dict(cached)
+        
+        try:
+            weather_info = await weather_inflight.ado(key, self._afetch_weather_data, location)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.error(f"Failed to fetch weather data: {e}")
+            return self._get_fallback_weather_data(location)
+        except KeyError as e:
+            logger.error(f"Unexpected weather API response format: {e}")
+            return self._get_fallback_weather_data(location)
+        
+        self.cache.set(key, weather_info)
+        return dict(weather_info)
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """Hit/miss/refresh counters for the weather cache"""
+        return self.cache.stats()
+    
+    def inflight_stats(self) -> Dict[str, int]:
+        """How many weather lookups were coalesced into an in-flight call"""
+        return weather_inflight.stats()
+    
+    def _cache_key(self, location: str) -> str:
+        """Normalize a city name so "  new delhi" and "New Delhi" share an entry"""
+        return " ".join(location.split()).lower()
+    
+    def _refresh_weather_data(self, location: str, key: str) -> None:
+        """Background refresh of a stale cache entry"""
+        try:
+            weather_info = self._fetch_weather_data(location)
+        except (requests.exceptions.RequestException, KeyError) as e:
+            logger.error(f"Failed to refresh weather data for {location}: {e}")
+            self.cache.end_refresh(key, failed=True)
+            return
+        self.cache.end_refresh(key, weather_info)
+    
+    async def _arefresh_weather_data(self, location: str, key: str) -> None:
+        """Background refresh of a stale cache entry on the event loop"""
+        try:
+            weather_info = await self._afetch_weather_data(location)
+        except (aiohttp.ClientError, asyncio.TimeoutError, KeyError) as e:
+            logger.error(f"Failed to refresh weather data for {location}: {e}")
+            self.cache.end_refresh(key, failed=True)
+            return
+        self.cache.end_refresh(key, weather_info)
+    
+    def _fetch_weather_data(self, location: str) -> Dict[str, Any]:
+        """Call OpenWeatherMap over the pooled session; raises on network or response format errors"""
+        response = self.session.get(self.base_url, params=self._request_params(location), timeout=self.timeout)
+        response.raise_for_status()
+        return self._parse_weather_response(response.json(), location)
+    
+    async def _afetch_weather_data(self, location: str) -> Dict[str, Any]:
+        """Async OpenWeatherMap call; raises on network or response format errors"""
+        session = await self._get_async_session()
+        async with session.get(self.base_url, params=self._request_params(location)) as response:
+            response.raise_for_status()
+            data = await response.json()
+        return self._parse_weather_response(data, location)
+    
+    async def _get_async_session(self) -> aiohttp.ClientSession:
+        """Shared aiohttp session for the running loop, created on first use"""
+        loop = asyncio.get_running_loop()
+        if self._async_session is None or self._async_session.closed or self._async_session_loop is not loop:
+            stale, stale_loop = self._async_session, self._async_session_loop
+            connector = aiohttp.TCPConnector(
+                limit_per_host=config.WEATHER_HTTP_POOL_SIZE,
+                keepalive_timeout=60
+            )
+            timeout = aiohttp.ClientTimeout(
+                sock_connect=config.WEATHER_CONNECT_TIMEOUT_SECONDS,
+                sock_read=config.WEATHER_READ_TIMEOUT_SECONDS
+            )
+            self._async_session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+            self._async_session_loop = loop
+            # Swap first so concurrent callers on this loop share the new session
+            await self._close_stale_session(stale, stale_loop)
+        return self._async_session
+    
+    @staticmethod
+    async def _close_stale_session(session: Optional[aiohttp.ClientSession], loop) -> None:
+        """Close a session left behind on a previous event loop"""
+        if session is None or session.closed:
+            return
+        if loop.is_closed():
+            # Its connections died with the loop, so closing here only releases the connector
+            await session.close()
+        else:
+            # The loop may be driven by another thread, so close it there
+            asyncio.run_coroutine_threadsafe(session.close(), loop)
+    
+    def _request_params(self, location: str) -> Dict[str, str]:
+        return {
+            'q': location,
+            'appid': self.api_key,
+            'units': 'metric'
+        }
+    
+    def _parse_weather_response(self, data: Dict[str, Any], location: str) -> Dict[str, Any]:
+        """Extract the fields we use from an OpenWeatherMap response"""
+        # Extract relevant weather information
+        weather_info = {
+            "condition": data['weather'][0]['main'].lower(),
+            "description": data['weather'][0]['description'],
+            "temperature": round(data['main']['temp']),
+            "feels_like": round(data['main']['feels_like']),
+            "humidity": data['main']['humidity'],
+            "city": data['name'],
+            "country": data['sys']['country']
+        }
+        
+        # Add food suggestions based on weather
+        weather_info["food_suggestions"] = self._get_weather_based_suggestions(
+            weather_info["condition"], 
+            weather_info["temperature"]
+        )
+        
+        logger.info(f"Successfully fetched weather for {location}: {weather_info['condition']}, {weather_info['temperature']}°C")
+        return weather_info
     
     def _get_weather_based_suggestions(self, condition: str, temperature: int) -> List[str]:
         """Get food suggestions based on weather conditions"""
@@ -178,16 +378,101 @@ class WeatherService:
             "food_suggestions": ["balanced meals", "seasonal favorites"]
         }
 
+# Persistent festival cache keyed by month and normalized location
+festival_cache = PersistentCache(config.FESTIVAL_CACHE_PATH, table="festival_foods")
+
+# In-process trend analysis cache keyed by bucketed weather context
+trends_cache = TTLCache(ttl_seconds=config.TRENDS_CACHE_TTL_SECONDS)
+
+# Identical festival and trend prompts already in flight are awaited, not resent
+festival_inflight = SingleFlight()
+trends_inflight = SingleFlight()
+
+# Chat replies reused for near-duplicate messages, partitioned by location
+chat_cache = SimilarityCache(
+    threshold=config.CHAT_CACHE_SIMILARITY_THRESHOLD,
+    ttl_seconds=config.CHAT_CACHE_TTL_SECONDS,
+    max_entries=config.CHAT_CACHE_MAX_ENTRIES,
+    max_bytes=config.CHAT_CACHE_MAX_BYTES
+)
+
+# Per-request count of Cohere calls; set by whoever wants to know the cost
+llm_call_counter: contextvars.ContextVar = contextvars.ContextVar("llm_call_counter", default=None)
+
+def count_llm_call() -> None:
+    counter = llm_call_counter.get()
+    if counter is not None:
+        counter[0] += 1
+
+# OpenWeatherMap condition -> coarse class used to bucket trend analyses
+WEATHER_CONDITION_CLASSES = {
+    "rain": "wet",
+    "drizzle": "wet",
+    "thunderstorm": "wet",
+    "snow": "snow",
+    "clear": "clear",
+    "clouds": "overcast",
+    "mist": "overcast",
+    "haze": "overcast",
+    "fog": "overcast",
+    "smoke": "overcast"
+}
+
 # Enhanced AI Service with better error handling
 class AIService:
-    def __init__(self, cohere_client):
+    def __init__(self, cohere_client, async_client=None,
+                 festival_store: Optional[PersistentCache] = None,
+                 trends_store: Optional[TTLCache] = None):
         self.co = cohere_client
+        # Async methods use this client when available and otherwise run the
+        # sync method in a worker thread so they never block the event loop
+        self.aco = async_client
+        self.festival_cache = festival_store if festival_store is not None else festival_cache
+        self.trends_cache = trends_store if trends_store is not None else trends_cache
     
     def get_festival_foods(self, month: str, location: str = "India") -> Dict[str, Any]:
         """Get festival foods using AI with proper error handling"""
+        cache_key = self._festival_cache_key(month, location)
+        cached = self.festival_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
         if not self.co:
             return self._get_fallback_festival_data(month, location)
         
+        return festival_inflight.do(cache_key, self._fetch_festival_foods, month, location)
+    
+    async def aget_festival_foods(self, month: str, location: str = "India") -> Dict[str, Any]:
+        """Async variant of get_festival_foods"""
+        if not self.aco:
+            return await asyncio.to_thread(self.get_festival_foods, month, location)
+        
+        cache_key = self._festival_cache_key(month, location)
+        cached = self.festival_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        return await festival_inflight.ado(cache_key, self._afetch_festival_foods, month, location)
+    
+    def _fetch_festival_foods(self, month: str, location: str) -> Dict[str, Any]:
+        try:
+            count_llm_call()
+            response = self.co.generate(**self._festival_request(month, location))
+            return self._parse_festival_response(response, month, location)
+        except Exception as e:
+            logger.error(f"Cohere API error for festivals: {e}")
+            return self._get_fallback_festival_data(month, location)
+    
+    async def _afetch_festival_foods(self, month: str, location: str) -> Dict[str, Any]:
+        try:
+            count_llm_call()
+            response = await self.aco.generate(**self._festival_request(month, location))
+            return self._parse_festival_response(response, month, location)
+        except Exception as e:
+            logger.error(f"Cohere API error for festivals: {e}")
+            return self._get_fallback_festival_data(month, location)
+    
+    def _festival_request(self, month: str, location: str) -> Dict[str, Any]:
         prompt = f"""
         List the major festivals celebrated in {location} during {month}. 
         For each festival, provide traditional foods that are commonly ordered online.
@@ -208,15 +493,11 @@ class AIService:
         Focus only on major festivals that significantly impact food ordering patterns.
         If no major festivals in {month}, return empty festivals array.
         """
-        
+        return {"model": 'command', "prompt": prompt, "max_tokens": 600, "temperature": 0.2}
+    
+    def _parse_festival_response(self, response, month: str, location: str) -> Dict[str, Any]:
+        """Extract and validate festival JSON, caching it; falls back on bad output"""
         try:
-            response = self.co.generate(
-                model='command',
-                prompt=prompt,
-                max_tokens=600,
-                temperature=0.2
-            )
-            
             text = response.generations[0].text.strip()
             # Add this before the JSON parsing to see what the API is actually returning
             logger.debug(f"Raw API response: {response.generations[0].text}")
@@ -245,6 +526,7 @@ class AIService:
             # Validate structure
             if 'festivals' in result and isinstance(result['festivals'], list):
                 logger.info(f"Successfully fetched {len(result['festivals'])} festivals for {month}")
+                self.festival_cache.set(self._festival_cache_key(month, location), result)
                 return result
             else:
                 raise ValueError("Invalid festival data structure")
@@ -252,15 +534,72 @@ class AIService:
         except (json.JSONDecodeError, ValueError) as e:
             logger.error(f"Failed to parse festival data: {e}")
             return self._get_fallback_festival_data(month, location)
-        except Exception as e:
-            logger.error(f"Cohere API error for festivals: {e}")
-            return self._get_fallback_festival_data(month, location)
+    
+    def inflight_stats(self) -> Dict[str, Dict[str, int]]:
+        """How many festival and trend calls were coalesced into an in-flight call"""
+        return {"festivals": festival_inflight.stats(), "trends": trends_inflight.stats()}
+    
+    def warm_festival_cache(self, cities: List[str]) -> int:
+        """Precompute festival foods for all 12 months in each city; returns entries added"""
+        added = 0
+        for city in cities:
+            for month in calendar.month_name[1:]:
+                cache_key = self._festival_cache_key(month, city)
+                if self.festival_cache.get(cache_key) is not None:
+                    continue
+                self.get_festival_foods(month, city)
+                # Fallback data is never cached, so only count real answers
+                if self.festival_cache.get(cache_key) is not None:
+                    added += 1
+                    logger.info(f"Cached festivals for {city}, {month}")
+        return added
+    
+    def _festival_cache_key(self, month: str, location: str) -> str:
+        return f"{month.lower()}|{' '.join(location.split()).lower()}"
     
     def analyze_food_trends(self, location: str, season: str, weather: Dict[str, Any]) -> Dict[str, Any]:
         """Analyze food trends using AI"""
+        cache_key = self._trends_cache_key(location, season, weather)
+        cached = self.trends_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
         if not self.co:
             return self._get_fallback_trends_data()
     
+        return trends_inflight.do(cache_key, self._fetch_food_trends, location, season, weather)
+    
+    async def aanalyze_food_trends(self, location: str, season: str, weather: Dict[str, Any]) -> Dict[str, Any]:
+        """Async variant of analyze_food_trends"""
+        if not self.aco:
+            return await asyncio.to_thread(self.analyze_food_trends, location, season, weather)
+        
+        cache_key = self._trends_cache_key(location, season, weather)
+        cached = self.trends_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        return await trends_inflight.ado(cache_key, self._afetch_food_trends, location, season, weather)
+    
+    def _fetch_food_trends(self, location: str, season: str, weather: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            count_llm_call()
+            response = self.co.generate(**self._trends_request(location, season, weather))
+            return self._parse_trends_response(response, location, season, weather)
+        except Exception as e:
+            logger.error(f"Cohere API error for trends: {e}")
+            return self._get_fallback_trends_data()
+    
+    async def _afetch_food_trends(self, location: str, season: str, weather: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            count_llm_call()
+            response = await self.aco.generate(**self._trends_request(location, season, weather))
+            return self._parse_trends_response(response, location, season, weather)
+        except Exception as e:
+            logger.error(f"Cohere API error for trends: {e}")
+            return self._get_fallback_trends_data()
+    
+    def _trends_request(self, location: str, season: str, weather: Dict[str, Any]) -> Dict[str, Any]:
         weather_desc = f"{weather.get('condition', 'pleasant')} weather, {weather.get('temperature', 25)}°C"
     
         prompt = f"""You are an expert food trend analyst. Analyze current food ordering trends for {location} during {season} season with {weather_desc}.
@@ -301,50 +640,75 @@ class AIService:
 
         Focus on realistic, popular food items available in {location}. Return ONLY the JSON object, no additional text or commentary.
         """
+        return {"model": 'command', "prompt": prompt, "max_tokens": 800, "temperature": 0.3}
     
-        try:
-            response = self.co.generate(
-                model='command',
-                prompt=prompt,
-                max_tokens=800,
-                temperature=0.3
-            )
-        
-            text = response.generations[0].text.strip()
-            logger.debug(f"Raw trends API response: {text}")  # Debug logging
+    def _parse_trends_response(self, response, location: str, season: str, weather: Dict[str, Any]) -> Dict[str, Any]:
+        """Extract and validate trends JSON, caching it; falls back on bad output"""
+        text = response.generations[0].text.strip()
+        logger.debug(f"Raw trends API response: {text}")  # Debug logging
         
         # Enhanced JSON extraction
-            try:
-                # Try to find JSON in the response
-                start = text.find('{')
-                end = text.rfind('}') + 1
-                if start != -1 and end != -1:
-                    json_text = text[start:end]
-                    result = json.loads(json_text)
-                else:
-                    raise ValueError("No JSON found in response")
-                
-            # Validate structure
-                required_keys = ['trending_cuisines', 'weather_foods', 'seasonal_specialties', 'order_patterns']
-                if not all(key in result for key in required_keys):
-                    raise ValueError("Missing required keys in response")
-                
-                logger.info(f"Successfully analyzed trends for {location}")
-                return result
+        try:
+            # Try to find JSON in the response
+            start = text.find('{')
+            end = text.rfind('}') + 1
+            if start != -1 and end != -1:
+                json_text = text[start:end]
+                result = json.loads(json_text)
+            else:
+                raise ValueError("No JSON found in response")
             
-            except (json.JSONDecodeError, ValueError) as e:
-                logger.error(f"Failed to parse trends data: {e}\nResponse was: {text}")
-                return self._get_fallback_trends_data()
+            # Validate structure
+            required_keys = ['trending_cuisines', 'weather_foods', 'seasonal_specialties', 'order_patterns']
+            if not all(key in result for key in required_keys):
+                raise ValueError("Missing required keys in response")
             
-        except Exception as e:
-            logger.error(f"Cohere API error for trends: {e}")
+            logger.info(f"Successfully analyzed trends for {location}")
+            self.trends_cache.set(self._trends_cache_key(location, season, weather), result)
+            return result
+        
+        except (json.JSONDecodeError, ValueError) as e:
+            logger.error(f"Failed to parse trends data: {e}\nResponse was: {text}")
             return self._get_fallback_trends_data()
     
+    def _trends_cache_key(self, location: str, season: str, weather: Dict[str, Any]) -> tuple:
+        """Canonical key: location, season, weather condition class and temperature band"""
+        condition = str(weather.get('condition', 'pleasant')).lower()
+        condition_class = WEATHER_CONDITION_CLASSES.get(condition, "mild")
+        band = config.TRENDS_TEMP_BAND_C
+        try:
+            temperature_band = int(float(weather.get('temperature', 25)) // band) * band
+        except (TypeError, ValueError):
+            temperature_band = None
+        return (' '.join(location.split()).lower(), season, condition_class, temperature_band)
+    
     def generate_personalized_recommendations(self, user_context: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Generate personalized recommendations using AI"""
         if not self.co:
             return self._get_fallback_recommendations()
     
+        try:
+            count_llm_call()
+            response = self.co.generate(**self._recommendations_request(user_context))
+            return self._parse_recommendations_response(response)
+        except Exception as e:
+            logger.error(f"Cohere API error for recommendations: {e}")
+            return self._get_fallback_recommendations()
+    
+    async def agenerate_personalized_recommendations(self, user_context: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Async variant of generate_personalized_recommendations"""
+        if not self.aco:
+            return await asyncio.to_thread(self.generate_personalized_recommendations, user_context)
+        
+        try:
+            count_llm_call()
+            response = await self.aco.generate(**self._recommendations_request(user_context))
+            return self._parse_recommendations_response(response)
+        except Exception as e:
+            logger.error(f"Cohere API error for recommendations: {e}")
+            return self._get_fallback_recommendations()
+    
+    def _recommendations_request(self, user_context: Dict[str, Any]) -> Dict[str, Any]:
         prompt = f"""You are an expert food recommendation system. Generate 5 personalized food recommendations for {user_context.get('location', 'Mumbai')} based on:
 
         Weather: {user_context.get('weather', {}).get('description', 'pleasant')}, {user_context.get('weather', {}).get ('temperature', 25)}°C
@@ -389,52 +753,68 @@ class AIService:
 
     Make recommendations specific, realistic, and available for food delivery. Consider weather, local preferences, and current trends. Return ONLY the JSON array, no additional text or commentary.
     """
+        return {"model": 'command', "prompt": prompt, "max_tokens": 1000, "temperature": 0.4}
     
-        try:
-            response = self.co.generate(
-                model='command',
-                prompt=prompt,
-                max_tokens=1000,
-                temperature=0.4
-            )
-        
-            text = response.generations[0].text.strip()
-            logger.debug(f"Raw recommendations API response: {text}")  # Debug logging
+    def _parse_recommendations_response(self, response) -> List[Dict[str, Any]]:
+        """Extract and validate the recommendations array; falls back on bad output"""
+        text = response.generations[0].text.strip()
+        logger.debug(f"Raw recommendations API response: {text}")  # Debug logging
         
         # Enhanced JSON extraction
-            try:
+        try:
             # Try to find JSON array in the response
-                start = text.find('[')
-                end = text.rfind(']') + 1
-                if start != -1 and end != -1:
-                    json_text = text[start:end]
-                    result = json.loads(json_text)
-                else:
-                    raise ValueError("No JSON array found in response")
-                
-            # Validate structure
-                if not isinstance(result, list):
-                    raise ValueError("Expected array but got something else")
-                if len(result) == 0:
-                    raise ValueError("Empty recommendations array")
-                
-                logger.info(f"Generated {len(result)} personalized recommendations")
-                return result
+            start = text.find('[')
+            end = text.rfind(']') + 1
+            if start != -1 and end != -1:
+                json_text = text[start:end]
+                result = json.loads(json_text)
+            else:
+                raise ValueError("No JSON array found in response")
             
-            except (json.JSONDecodeError, ValueError) as e:
-                logger.error(f"Failed to parse recommendations: {e}\nResponse was: {text}")
-                return self._get_fallback_recommendations()
+            # Validate structure
+            if not isinstance(result, list):
+                raise ValueError("Expected array but got something else")
+            if len(result) == 0:
+                raise ValueError("Empty recommendations array")
             
-        except Exception as e:
-            logger.error(f"Cohere API error for recommendations: {e}")
-            return self._get_fallback_recommendations()
+            logger.info(f"Generated {len(result)} personalized recommendations")
+            return result
         
+        except (json.JSONDecodeError, ValueError) as e:
+            logger.error(f"Failed to parse recommendations: {e}\nResponse was: {text}")
+            return self._get_fallback_recommendations()
     
     def explain_recommendation(self, recommendation: Dict[str, Any], context: Dict[str, Any]) -> str:
         """Generate explanation for a recommendation"""
         if not self.co:
             return self._get_fallback_explanation(recommendation)
         
+        try:
+            count_llm_call()
+            response = self.co.generate(**self._explanation_request(recommendation, context))
+            explanation = response.generations[0].text.strip()
+            return explanation if explanation else self._get_fallback_explanation(recommendation)
+            
+        except Exception as e:
+            logger.error(f"Failed to generate explanation: {e}")
+            return self._get_fallback_explanation(recommendation)
+    
+    async def aexplain_recommendation(self, recommendation: Dict[str, Any], context: Dict[str, Any]) -> str:
+        """Async variant of explain_recommendation"""
+        if not self.aco:
+            return await asyncio.to_thread(self.explain_recommendation, recommendation, context)
+        
+        try:
+            count_llm_call()
+            response = await self.aco.generate(**self._explanation_request(recommendation, context))
+            explanation = response.generations[0].text.strip()
+            return explanation if explanation else self._get_fallback_explanation(recommendation)
+            
+        except Exception as e:
+            logger.error(f"Failed to generate explanation: {e}")
+            return self._get_fallback_explanation(recommendation)
+    
+    def _explanation_request(self, recommendation: Dict[str, Any], context: Dict[str, Any]) -> Dict[str, Any]:
         prompt = f"""
         Explain why we recommended "{recommendation.get('dish_name', 'this dish')}" to the user.
         
@@ -449,21 +829,92 @@ class AIService:
         
         Start with "Perfect choice because..." and keep it conversational and specific.
         """
+        return {"model": 'command', "prompt": prompt, "max_tokens": 150, "temperature": 0.3}
+    
+    def explain_recommendations(self, recommendations: List[Dict[str, Any]], context: Dict[str, Any]) -> Dict[str, str]:
+        """Generate explanations for all recommendations with a single prompt.
+        
+        Returns a map of dish name to explanation. Dishes the model skipped or
+        answered badly are left out so the caller can explain them one by one.
+        """
+        if not self.co or not recommendations:
+            return {}
         
         try:
-            response = self.co.generate(
-                model='command',
-                prompt=prompt,
-                max_tokens=150,
-                temperature=0.3
-            )
+            count_llm_call()
+            response = self.co.generate(**self._batch_explanation_request(recommendations, context))
+            return self._parse_batch_explanation_response(response, recommendations)
+        except Exception as e:
+            logger.error(f"Failed to generate batch explanations: {e}")
+            return {}
+    
+    async def aexplain_recommendations(self, recommendations: List[Dict[str, Any]], context: Dict[str, Any]) -> Dict[str, str]:
+        """Async variant of explain_recommendations"""
+        if not self.aco:
+            return await asyncio.to_thread(self.explain_recommendations, recommendations, context)
+        if not recommendations:
+            return {}
+        
+        try:
+            count_llm_call()
+            response = await self.aco.generate(**self._batch_explanation_request(recommendations, context))
+            return self._parse_batch_explanation_response(response, recommendations)
+        except Exception as e:
+            logger.error(f"Failed to generate batch explanations: {e}")
+            return {}
+    
+    def _batch_explanation_request(self, recommendations: List[Dict[str, Any]], context: Dict[str, Any]) -> Dict[str, Any]:
+        dish_names = [rec.get('dish_name', 'this dish') for rec in recommendations]
+        dishes_text = "\n".join(f"- {name}" for name in dish_names)
+        
+        prompt = f"""
+        Explain why we recommended each of these dishes to the user:
+        {dishes_text}
+        
+        Context:
+        - Weather: {context.get('weather', {}).get('description', 'pleasant')}
+        - Location: {context.get('location', 'your area')}
+        - Current trends: {context.get('trends', {}).get('trending_cuisines', [])}
+        - Festivals: {[f['name'] for f in context.get('festivals', {}).get('festivals', [])]}
+        
+        For every dish, write a friendly, 1-2 sentence explanation that helps the user
+        understand why this food item is perfect for them right now. Start each one with
+        "Perfect choice because..." and keep it conversational and specific.
+        
+        Return ONLY a valid JSON object mapping each dish name exactly as listed to its explanation:
+        {{
+            "dish name": "Perfect choice because ..."
+        }}
+        """
+        return {"model": 'command', "prompt": prompt, "max_tokens": 150 * len(dish_names), "temperature": 0.3}
+    
+    def _parse_batch_explanation_response(self, response, recommendations: List[Dict[str, Any]]) -> Dict[str, str]:
+        """Parse the dish -> explanation map, dropping anything unusable"""
+        dish_names = [rec.get('dish_name', 'this dish') for rec in recommendations]
+        try:
+            text = response.generations[0].text.strip()
+            logger.debug(f"Raw batch explanation response: {text}")
             
-            explanation = response.generations[0].text.strip()
-            return explanation if explanation else self._get_fallback_explanation(recommendation)
+            start = text.find('{')
+            end = text.rfind('}') + 1
+            if start == -1 or end == 0:
+                raise ValueError("No JSON object found in response")
+            result = json.loads(text[start:end])
+            if not isinstance(result, dict):
+                raise ValueError("Expected object but got something else")
             
-        except Exception as e:
-            logger.error(f"Failed to generate explanation: {e}")
-            return self._get_fallback_explanation(recommendation)
+            # Keep only usable explanations for dishes we actually asked about
+            explanations = {
+                name: result[name].strip()
+                for name in dish_names
+                if isinstance(result.get(name), str) and result[name].strip()
+            }
+            logger.info(f"Batch explained {len(explanations)}/{len(dish_names)} recommendations")
+            return explanations
+            
+        except (json.JSONDecodeError, ValueError) as e:
+            logger.error(f"Failed to parse batch explanations: {e}")
+            return {}
     
     def _get_fallback_festival_data(self, month: str, location: str) -> Dict[str, Any]:
         """Fallback festival data"""
@@ -534,11 +985,20 @@ class AIService:
         dish_name = recommendation.get('dish_name', 'this dish')
         return f"Perfect choice because {dish_name} is a popular favorite that matches current preferences and trends!"
 
+# Relative share of the remaining latency budget each pipeline stage may use.
+# Time a stage does not spend carries over to the stages after it.
+STAGE_BUDGET_SHARES = {
+    "gather_data": 0.2,
+    "analyze_trends": 0.25,
+    "generate_recommendations": 0.35,
+    "add_explanations": 0.2
+}
+
 # Main Smart Food Agent
 class SmartFoodAgent:
     def __init__(self):
         self.weather_service = WeatherService(config.OPENWEATHER_API_KEY)
-        self.ai_service = AIService(co)
+        self.ai_service = AIService(co, aco)
         self.graph = self._build_graph()
     
     def _build_graph(self):
@@ -560,7 +1020,7 @@ class SmartFoodAgent:
         
         return workflow.compile()
     
-    def _gather_data(self, state: AgentState) -> AgentState:
+    async def _gather_data(self, state: AgentState) -> AgentState:
         """Gather weather and festival data"""
         logger.info("📊 Gathering contextual data...")
         
@@ -568,24 +1028,39 @@ class SmartFoodAgent:
         current_month = datetime.now().strftime("%B")
         errors = []
         
+        # Weather and festivals are independent, so fetch them side by side;
+        # the stage then costs the slower of the two lookups, not their sum
+        timeout = self._stage_timeout(state, "gather_data")
+        weather, festivals = await asyncio.gather(
+            asyncio.wait_for(self.weather_service.aget_weather_data(location), timeout),
+            asyncio.wait_for(self.ai_service.aget_festival_foods(current_month, location), timeout),
+            return_exceptions=True
+        )
+        
         # Get weather data
-        try:
-            weather = self.weather_service.get_weather_data(location)
-            logger.info(f"🌤️ Weather: {weather.get('condition')} at {weather.get('temperature')}°C")
-        except Exception as e:
-            logger.error(f"Failed to fetch weather: {e}")
+        if isinstance(weather, asyncio.TimeoutError):
+            logger.warning("Weather lookup ran out of latency budget")
+            weather = self.weather_service._get_fallback_weather_data(location)
+            errors.append("Weather lookup exceeded latency budget; using fallback data")
+        elif isinstance(weather, Exception):
+            logger.error(f"Failed to fetch weather: {weather}")
             weather = self.weather_service._get_fallback_weather_data(location)
             errors.append("Weather data unavailable")
+        else:
+            logger.info(f"🌤️ Weather: {weather.get('condition')} at {weather.get('temperature')}°C")
         
         # Get festival data
-        try:
-            festivals = self.ai_service.get_festival_foods(current_month, location)
-            festival_count = len(festivals.get('festivals', []))
-            logger.info(f"🎉 Found {festival_count} festivals for {current_month}")
-        except Exception as e:
-            logger.error(f"Failed to fetch festivals: {e}")
+        if isinstance(festivals, asyncio.TimeoutError):
+            logger.warning("Festival lookup ran out of latency budget")
+            festivals = self.ai_service._get_fallback_festival_data(current_month, location)
+            errors.append("Festival lookup exceeded latency budget; using fallback data")
+        elif isinstance(festivals, Exception):
+            logger.error(f"Failed to fetch festivals: {festivals}")
             festivals = {"festivals": []}
             errors.append("Festival data unavailable")
+        else:
+            festival_count = len(festivals.get('festivals', []))
+            logger.info(f"🎉 Found {festival_count} festivals for {current_month}")
         
         # Update state
         state.update({
@@ -597,7 +1072,7 @@ class SmartFoodAgent:
         
         return state
     
-    def _analyze_trends(self, state: AgentState) -> AgentState:
+    async def _analyze_trends(self, state: AgentState) -> AgentState:
         """Analyze food trends"""
         logger.info("📈 Analyzing food trends...")
         
@@ -606,9 +1081,16 @@ class SmartFoodAgent:
         season = self._get_season()
         
         try:
-            trends = self.ai_service.analyze_food_trends(location, season, weather)
+            trends = await asyncio.wait_for(
+                self.ai_service.aanalyze_food_trends(location, season, weather),
+                self._stage_timeout(state, "analyze_trends")
+            )
             trending_cuisines = trends.get('trending_cuisines', [])
             logger.info(f"🔥 Trending cuisines: {', '.join(trending_cuisines[:3])}")
+        except asyncio.TimeoutError:
+            logger.warning("Trend analysis ran out of latency budget")
+            trends = self.ai_service._get_fallback_trends_data()
+            self._record_error(state, "Trend analysis exceeded latency budget; using fallback data")
         except Exception as e:
             logger.error(f"Failed to analyze trends: {e}")
             trends = self.ai_service._get_fallback_trends_data()
@@ -618,7 +1100,7 @@ class SmartFoodAgent:
         state["trends"] = trends
         return state
     
-    def _generate_recommendations(self, state: AgentState) -> AgentState:
+    async def _generate_recommendations(self, state: AgentState) -> AgentState:
         """Generate personalized recommendations"""
         logger.info("🎯 Generating personalized recommendations...")
         
@@ -632,8 +1114,15 @@ class SmartFoodAgent:
         }
         
         try:
-            recommendations = self.ai_service.generate_personalized_recommendations(context)
+            recommendations = await asyncio.wait_for(
+                self.ai_service.agenerate_personalized_recommendations(context),
+                self._stage_timeout(state, "generate_recommendations")
+            )
             logger.info(f"✨ Generated {len(recommendations)} recommendations")
+        except asyncio.TimeoutError:
+            logger.warning("Recommendation generation ran out of latency budget")
+            recommendations = self.ai_service._get_fallback_recommendations()
+            self._record_error(state, "Recommendations exceeded latency budget; using fallback data")
         except Exception as e:
             logger.error(f"Failed to generate recommendations: {e}")
             recommendations = self.ai_service._get_fallback_recommendations()
@@ -643,7 +1132,7 @@ class SmartFoodAgent:
         state["recommendations"] = recommendations
         return state
     
-    def _add_explanations(self, state: AgentState) -> AgentState:
+    async def _add_explanations(self, state: AgentState) -> AgentState:
         """Add explanations to recommendations"""
         logger.info("💡 Adding explanations...")
         
@@ -655,18 +1144,93 @@ class SmartFoodAgent:
             "location": state.get("location", "Mumbai")
         }
         
-        for rec in recommendations:
+        # Every explanation call must finish within this stage's share of the budget
+        stage_timeout = self._stage_timeout(state, "add_explanations")
+        stage_deadline = time.monotonic() + stage_timeout if stage_timeout is not None else None
+        over_budget = 0
+        
+        def call_timeout() -> float:
+            if stage_deadline is None:
+                return config.EXPLANATION_TIMEOUT_SECONDS
+            return max(0.0, min(config.EXPLANATION_TIMEOUT_SECONDS, stage_deadline - time.monotonic()))
+        
+        # Try to explain everything with one call first; whatever the batch
+        # misses goes through the per-item path below
+        explanations = {}
+        if config.EXPLANATION_MODE == "batch":
             try:
-                explanation = self.ai_service.explain_recommendation(rec, context)
-                rec["explanation"] = explanation
+                explanations = await asyncio.wait_for(
+                    self.ai_service.aexplain_recommendations(recommendations, context),
+                    timeout=call_timeout()
+                )
+            except asyncio.TimeoutError:
+                logger.error("Batch explanation timed out")
             except Exception as e:
-                logger.error(f"Failed to generate explanation for {rec.get('dish_name', 'unknown')}: {e}")
-                rec["explanation"] = self.ai_service._get_fallback_explanation(rec)
+                logger.error(f"Failed to generate batch explanations: {e}")
+        
+        # Bound the number of explanation calls in flight at once
+        semaphore = asyncio.Semaphore(max(1, config.EXPLANATION_MAX_CONCURRENCY))
+        
+        async def explain(rec: Dict[str, Any]) -> str:
+            nonlocal over_budget
+            dish_name = rec.get('dish_name', 'this dish')
+            if dish_name in explanations:
+                return explanations[dish_name]
+            async with semaphore:
+                timeout = call_timeout()
+                try:
+                    return await asyncio.wait_for(
+                        self.ai_service.aexplain_recommendation(rec, context),
+                        timeout=timeout
+                    )
+                except asyncio.TimeoutError:
+                    logger.error(f"Explanation for {rec.get('dish_name', 'unknown')} timed out")
+                    if timeout < config.EXPLANATION_TIMEOUT_SECONDS:
+                        over_budget += 1
+                except Exception as e:
+                    logger.error(f"Failed to generate explanation for {rec.get('dish_name', 'unknown')}: {e}")
+                return self.ai_service._get_fallback_explanation(rec)
+        
+        # Publish each explanation as soon as it is ready for streaming callers
+        writer = get_stream_writer()
+        
+        async def explain_and_publish(index: int, rec: Dict[str, Any]) -> str:
+            explanation = await explain(rec)
+            writer({"index": index, "dish_name": rec.get('dish_name', 'this dish'), "explanation": explanation})
+            return explanation
+        
+        # gather keeps results in the same order as the recommendations
+        explanations = await asyncio.gather(
+            *(explain_and_publish(index, rec) for index, rec in enumerate(recommendations))
+        )
+        for rec, explanation in zip(recommendations, explanations):
+            rec["explanation"] = explanation
+        
+        if over_budget:
+            self._record_error(
+                state, f"Explanations exceeded latency budget; using fallback text for {over_budget} dishes"
+            )
         
         state["final_recommendations"] = recommendations
         logger.info("✅ Processing completed successfully")
         return state
     
+    def _stage_timeout(self, state: AgentState, stage: str) -> Optional[float]:
+        """Seconds a stage may use: its share of the budget left for it and later stages"""
+        deadline = state.get("deadline")
+        if deadline is None:
+            return None
+        stages = list(STAGE_BUDGET_SHARES)
+        remaining_shares = sum(STAGE_BUDGET_SHARES[name] for name in stages[stages.index(stage):])
+        remaining = max(0.0, deadline - time.monotonic())
+        return remaining * STAGE_BUDGET_SHARES[stage] / remaining_shares
+    
+    def _record_error(self, state: AgentState, message: str) -> None:
+        """Record a degradation so the response reports it in errors"""
+        if state.get("error_messages") is None:
+            state["error_messages"] = []
+        state["error_messages"].append(message)
+    
     def _get_season(self) -> str:
         """Get current season"""
         month = datetime.now().month
@@ -691,9 +1255,12 @@ class SmartFoodAgent:
         else:
             return "night"
     
-    async def recommend_food(self, user_id: str, location: str = "Mumbai",user_message: str = "") -> Dict[str, Any]:
-        """Main method to get food recommendations"""
-        initial_state: AgentState = {
+    def build_initial_state(self, user_id: str, location: str, user_message: str,
+                            deadline_ms: Optional[int]) -> AgentState:
+        """Pipeline input state; deadline_ms defaults to REQUEST_DEADLINE_MS"""
+        if deadline_ms is None:
+            deadline_ms = config.REQUEST_DEADLINE_MS
+        return {
             "user_id": user_id,
             "location": location or "Mumbai",
             "user_message": user_message, 
@@ -703,8 +1270,18 @@ class SmartFoodAgent:
             "recommendations": None,
             "final_recommendations": None,
             "current_month": None,
-            "error_messages": []
+            "error_messages": [],
+            "deadline": time.monotonic() + deadline_ms / 1000 if deadline_ms and deadline_ms > 0 else None
         }
+    
+    async def recommend_food(self, user_id: str, location: str = "Mumbai",user_message: str = "",
+                             deadline_ms: Optional[int] = None) -> Dict[str, Any]:
+        """Main method to get food recommendations.
+        
+        deadline_ms is the end-to-end latency budget (defaults to
+        REQUEST_DEADLINE_MS); stages that run out of it fall back to default data.
+        """
+        initial_state = self.build_initial_state(user_id, location, user_message, deadline_ms)
         
         try:
             logger.info("🔄 Starting recommendation pipeline...")
@@ -741,35 +1318,170 @@ class SmartFoodAgent:
                 "demo_mode": True
             }
 
+    async def stream_recommendations(self, user_id: str, location: str = "Mumbai", user_message: str = "",
+                                     deadline_ms: Optional[int] = None) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """Run the pipeline and yield (event, data) pairs as soon as each piece is ready.
+        
+        Events arrive in order: "context" once weather and festivals are known,
+        one "recommendation" per dish, one "explanation" per dish as it
+        completes (in completion order), and finally "done" with any errors.
+        """
+        initial_state = self.build_initial_state(user_id, location, user_message, deadline_ms)
+        errors: List[str] = []
+        
+        try:
+            logger.info("🔄 Starting streaming recommendation pipeline...")
+            async for mode, chunk in self.graph.astream(initial_state, stream_mode=["updates", "custom"]):
+                if mode == "custom":
+                    yield "explanation", chunk
+                    continue
+                
+                for node, update in chunk.items():
+                    errors = update.get("error_messages") or errors
+                    if node == "gather_data":
+                        yield "context", {
+                            "location": update.get("location"),
+                            "weather": update.get("weather"),
+                            "festivals": update.get("festivals"),
+                            "current_month": update.get("current_month"),
+                            "demo_mode": config.is_demo_mode()
+                        }
+                    elif node == "generate_recommendations":
+                        for index, rec in enumerate(update.get("recommendations") or []):
+                            # Copy: the explanation stage keeps mutating these dicts
+                            yield "recommendation", {"index": index, "recommendation": dict(rec)}
+            
+            logger.info("✅ Streaming recommendation pipeline completed successfully")
+        except Exception as e:
+            logger.error(f"❌ Critical error in streaming recommendation pipeline: {e}")
+            errors = list(errors) + [f"System error: {str(e)}"]
+        
+        yield "done", {
+            "errors": errors,
+            "timestamp": datetime.now().isoformat(),
+            "demo_mode": config.is_demo_mode()
+        }
+
 # Chat Interface
 class FoodChatBot:
     def __init__(self):
         self.agent = SmartFoodAgent()
-        self.ai_service = AIService(co)
-    
-   # In FoodChatBot class
-async def chat_about_food(self, user_message: str, location: str = "Mumbai") -> str:
-    """Enhanced chat interface with emotional awareness"""
-    result = await self.agent.recommend_food(
-        user_id="user",
-        location=location,
-        user_message=user_message  # Critical for context
-    )
+        self.ai_service = AIService(co, aco)
     
-    recommendations = result.get("recommendations", [])
+    async def chat_about_food(self, user_message: str, location: str = "Mumbai") -> str:
+        """Enhanced chat interface with emotional awareness"""
+        scope = self._cache_scope(location)
+        cached = chat_cache.get(user_message, scope)
+        if cached is not None:
+            return cached
+        
+        counter = [0]
+        token = llm_call_counter.set(counter)
+        try:
+            response = await self._compose_reply(user_message, location)
+        finally:
+            llm_call_counter.reset(token)
+        chat_cache.set(user_message, response, scope, llm_calls=counter[0])
+        return response
     
-    # Build empathetic response
-    response = "🍽️ **Here's what I recommend to brighten your day:**\n\n" if any(
-        word in user_message.lower() for word in ["sad", "depressed", "lonely"]
-    ) else "🍽️ **Here are my recommendations:**\n\n"
+    async def _compose_reply(self, user_message: str, location: str) -> str:
+        result = await self.agent.recommend_food(
+            user_id="user",
+            location=location,
+            user_message=user_message  # Critical for context
+        )
+        
+        recommendations = result.get("recommendations", [])
+        
+        # Build empathetic response
+        response = self._greeting(user_message)
+        for i, rec in enumerate(recommendations[:3], 1):
+            response += self._format_recommendation(i, rec)
+        
+        return response
     
-    for i, rec in enumerate(recommendations[:3], 1):
-        response += f"{i}. {rec.get('emoji', '🍛')} **{rec['dish_name']}** ({rec['cuisine']})\n"
-        response += f"   💡 {rec.get('reason', 'Perfect for you!')}\n"
-        if "comfort" in rec.get("tags", []):
-            response += "   🧡 Great for mood boosting\n"
+    async def stream_chat_about_food(self, user_message: str, location: str = "Mumbai") -> AsyncIterator[str]:
+        """Streaming chat: yields the reply in parts as each becomes available.
+        
+        The text is the same as chat_about_food's: the greeting goes out
+        immediately, then one part per dish once the pipeline has produced
+        the recommendations. LLM output is not streamed token by token. A
+        reply cached for a similar message is sent as a single chunk.
+        """
+        scope = self._cache_scope(location)
+        cached = chat_cache.get(user_message, scope)
+        if cached is not None:
+            yield cached
+            return
+        
+        counter = [0]
+        queue: asyncio.Queue = asyncio.Queue()
+        finished = object()
+        
+        async def produce():
+            # The reply runs in one task with its own context copy: callers such
+            # as app.iter_async resume this generator from a new task per chunk,
+            # so a ContextVar token set here could not be reset after a yield
+            llm_call_counter.set(counter)
+            try:
+                async for text in self._stream_reply(user_message, location):
+                    queue.put_nowait(text)
+            finally:
+                queue.put_nowait(finished)
+        
+        producer = asyncio.create_task(produce())
+        parts = []
+        try:
+            while True:
+                text = await queue.get()
+                if text is finished:
+                    break
+                parts.append(text)
+                yield text
+            await producer  # re-raise a failed reply instead of caching it
+        finally:
+            producer.cancel()
+        chat_cache.set(user_message, "".join(parts), scope, llm_calls=counter[0])
+    
+    async def _stream_reply(self, user_message: str, location: str) -> AsyncIterator[str]:
+        """The same reply as _compose_reply: the greeting, then one part per dish"""
+        yield self._greeting(user_message)
+        
+        state = self.agent.build_initial_state("user", location, user_message, None)
+        # Only the stages up to recommendation generation are needed; closing
+        # the stream early cancels the explanation stage the chat does not use
+        try:
+            async with contextlib.aclosing(self.agent.graph.astream(state, stream_mode="updates")) as updates:
+                async for update in updates:
+                    for node, node_state in update.items():
+                        state.update(node_state)
+                    if state.get("recommendations") is not None:
+                        break
+        except Exception as e:
+            logger.error(f"❌ Chat recommendation pipeline failed: {e}")
+        
+        recommendations = state.get("recommendations") or self.ai_service._get_fallback_recommendations()
+        for i, rec in enumerate(recommendations[:3], 1):
+            yield self._format_recommendation(i, rec)
     
-    return response
+    def cache_stats(self) -> Dict[str, Any]:
+        """Hit rate and LLM calls saved by the chat similarity cache"""
+        return chat_cache.stats()
+    
+    def _cache_scope(self, location: str) -> str:
+        return " ".join(location.lower().split())
+    
+    def _greeting(self, user_message: str) -> str:
+        return "🍽️ **Here's what I recommend to brighten your day:**\n\n" if any(
+            word in user_message.lower() for word in ["sad", "depressed", "lonely"]
+        ) else "🍽️ **Here are my recommendations:**\n\n"
+    
+    def _format_recommendation(self, index: int, rec: Dict[str, Any]) -> str:
+        text = f"{index}. {rec.get('emoji', '🍛')} **{rec['dish_name']}** ({rec['cuisine']})\n"
+        text += f"   💡 {rec.get('reason', 'Perfect for you!')}\n"
+        if "comfort" in rec.get("tags", []):
+            text += "   🧡 Great for mood boosting\n"
+        return text
 
 # Usage Examples
 async def main():
@@ -975,21 +1687,44 @@ if __name__ == "__main__":
     import argparse
     
     parser = argparse.ArgumentParser(description="Smart Food Recommendation Agent")
-    parser.add_argument("--mode", choices=["demo", "chat", "interactive", "setup"], 
+    parser.add_argument("--mode", choices=["demo", "chat", "interactive", "setup", "warm-festivals"], 
                        default="demo", help="Run mode")
     parser.add_argument("--location", default="Mumbai", help="Default location")
+    parser.add_argument("--cities", default="Mumbai,Delhi,Bangalore,Hyderabad,Chennai,Kolkata,Pune,Ahmedabad",
+                       help="Comma-separated cities to precompute in warm-festivals mode")
     
     args = parser.parse_args()
     
     if args.mode == "setup":
         setup_environment()
     elif args.mode == "demo":
-        asyncio.run(main())
-        asyncio.run(chat_example())
+        # One event loop for both demos so the async Cohere client can reuse its connections
+        async def run_demo():
+            await main()
+            await chat_example()
+        asyncio.run(run_demo())
     elif args.mode == "chat":
         asyncio.run(chat_example())
     elif args.mode == "interactive":
         asyncio.run(interactive_chat())
+    elif args.mode == "warm-festivals":
+        if not co:
+            # The client is only created when both keys are set (see is_demo_mode)
+            missing = [
+                name for name, value in (("COHERE_API_KEY", config.COHERE_API_KEY),
+                                         ("OPENWEATHER_API_KEY", config.OPENWEATHER_API_KEY))
+                if value == "demo-key-replace-with-real"
+            ]
+            for name in missing:
+                print(f"⚠️  {name} is not set")
+            if missing:
+                print("⚠️  Set the missing keys to warm the festival cache")
+            else:
+                print("⚠️  Cohere client failed to initialize - see the error above")
+        else:
+            cities = [city.strip() for city in args.cities.split(",") if city.strip()]
+            added = AIService(co).warm_festival_cache(cities)
+            print(f"🎉 Festival cache warmed: {added} new entries in {config.FESTIVAL_CACHE_PATH}")
     else:
         print("Use --help to see available options")
 
@@ -1,18 +1,70 @@
+import atexit
+import heapq
 import os
 import json
+import zlib
 from datetime import datetime, timedelta
-from typing import TypedDict, List, Dict
+from typing import TypedDict, List, Dict, Optional, Tuple
 from langgraph.graph import StateGraph, END
 import cohere
 import random
 from dotenv import load_dotenv
+import catalog as catalog_module
+from catalog import CatalogIndex, RestaurantCatalog, normalize_city, restaurant_opportunities
+from catalog_store import CatalogStore, CatalogWriter
+from deal_insights import InsightsRefresher
+from deal_snapshots import DealSnapshotCache
+from opportunities import OpportunityTracker
 
 load_dotenv()
 
+# "incremental" keeps opportunities up to date and re-evaluates only changed
+# restaurants; "columnar" runs the rules as NumPy masks over the whole catalog;
+# "python" scans the dicts. Without NumPy, "columnar" falls back to the scan.
+# "sql" keeps no catalog in memory and reads only the matching candidate
+# restaurants from the catalog store on each request.
+#
+# The in-memory engines load the catalog from the store once per process and
+# never re-read it: inventory/sales updates ingested by one gunicorn worker are
+# written to the store but not seen by other workers. They therefore need a
+# single worker (render.yaml runs one, with threads); run several workers with
+# DEAL_ENGINE=sql, where every request and update goes through the shared store.
+DEAL_ENGINE = os.getenv('DEAL_ENGINE', 'incremental')
+
+# Every N incremental reads, compare against a full recompute (0 disables)
+DEAL_CONSISTENCY_CHECK_EVERY = int(os.getenv('DEAL_CONSISTENCY_CHECK_EVERY', '0'))
+
+# Share the rule-based deals between requests in the same hour while the
+# catalog is unchanged ("0" recomputes them on every request)
+DEAL_SNAPSHOTS = os.getenv('DEAL_SNAPSHOTS', '1') != '0'
+
+# "background" serves LLM insights generated off the request path, refreshed
+# every DEAL_INSIGHTS_REFRESH_SECONDS or when the opportunities change by at
+# least DEAL_INSIGHTS_CHANGE_THRESHOLD; "inline" calls Cohere in every request
+DEAL_INSIGHTS_MODE = os.getenv('DEAL_INSIGHTS_MODE', 'background')
+DEAL_INSIGHTS_REFRESH_SECONDS = float(os.getenv('DEAL_INSIGHTS_REFRESH_SECONDS', '300'))
+DEAL_INSIGHTS_CHANGE_THRESHOLD = float(os.getenv('DEAL_INSIGHTS_CHANGE_THRESHOLD', '0.2'))
+# Most filter combinations to keep insights for; the least recently read go first
+DEAL_INSIGHTS_MAX_KEYS = int(os.getenv('DEAL_INSIGHTS_MAX_KEYS', '256'))
+
+# Order of equally ranked deals: "seeded" derives it from DEAL_RANKING_SEED
+# (or the request's seed) and the hour, so identical requests within an hour
+# get identical results; "random" shuffles ties on every request
+DEAL_RANKING_MODE = os.getenv('DEAL_RANKING_MODE', 'seeded')
+DEAL_RANKING_SEED = os.getenv('DEAL_RANKING_SEED', '0')
+
+# SQLite restaurant catalog shared by all workers on the host
+CATALOG_DB_PATH = os.getenv(
+    'CATALOG_DB_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'catalog.db')
+)
+# Seconds between write-behind flushes of inventory/sales updates to the store
+CATALOG_FLUSH_SECONDS = float(os.getenv('CATALOG_FLUSH_SECONDS', '0.5'))
+
 # Initialize Cohere
 co = cohere.Client(os.getenv('COHERE_API_KEY', '1iiAhGbTpnAgRzMZSXk25pwXEovJW0N8a3P9QlTY'))  # Fallback for testing
 
-# Restaurant Database
+# Seed data, loaded into the catalog store when it is empty
 RESTAURANTS = [
     {
         "id": "resto_5",
@@ -256,20 +308,59 @@ RESTAURANTS = [
     }
 ]
 
+catalog_store = CatalogStore(CATALOG_DB_PATH)
+catalog_store.seed(RESTAURANTS)
+
+# Versioned in-memory catalog; its indexes are rebuilt only when it changes,
+# and inventory/sales updates reach the store through a write-behind writer
+restaurant_catalog = RestaurantCatalog(catalog_store.load() if DEAL_ENGINE != "sql" else [])
+restaurant_catalog.writer = CatalogWriter(
+    catalog_store, restaurant_catalog.record, interval_seconds=CATALOG_FLUSH_SECONDS
+)
+atexit.register(restaurant_catalog.writer.flush)
+# gunicorn sets WEB_CONCURRENCY as its default worker count
+web_concurrency = os.getenv('WEB_CONCURRENCY', '1')
+if DEAL_ENGINE != "sql" and web_concurrency.isdigit() and int(web_concurrency) > 1:
+    print(f"⚠️ DEAL_ENGINE={DEAL_ENGINE} keeps a per-worker catalog; inventory updates will not be "
+          "shared between workers. Use one worker or DEAL_ENGINE=sql.")
 
 class AgentState(TypedDict):
     restaurants: List[Dict]
+    restaurant_rows: Optional[List[int]]  # catalog rows matching the request filters, None for all
+    catalog: CatalogIndex
     current_time: datetime
     detected_opportunities: List[Dict]
+    rule_deals: Optional[List[Dict]]  # prebuilt by the snapshot layer, else None
     generated_deals: List[Dict]
     user_request: Dict
     llm_insights: Dict
+    insights_age_seconds: Optional[float]  # None until background insights exist
     final_deals: List[Dict]  # Added this to ensure the key exists
+    deal_summary: Dict  # aggregates over all matching deals, not just the returned page
 
 class DealAgent:
-    def __init__(self):
+    def __init__(self, catalog: RestaurantCatalog = None, store: CatalogStore = None):
+        self.catalog = catalog or restaurant_catalog
+        self.store = store or catalog_store
+        self.tracker = OpportunityTracker(self.catalog, check_every=DEAL_CONSISTENCY_CHECK_EVERY)
+        self.snapshots = DealSnapshotCache(self.catalog, self._build_snapshot)
+        self.insights = InsightsRefresher(
+            self._generate_insights,
+            interval_seconds=DEAL_INSIGHTS_REFRESH_SECONDS,
+            change_threshold=DEAL_INSIGHTS_CHANGE_THRESHOLD,
+            max_keys=DEAL_INSIGHTS_MAX_KEYS
+        )
         self.workflow = self._build_workflow()
     
+    def apply_updates(self, updates: List[Dict]) -> Dict:
+        """Apply a batch of inventory/sales updates to the catalog"""
+        if DEAL_ENGINE == "sql":
+            # The store has no revision counter; the in-memory catalog is not updated
+            applied, errors = self.store.apply_updates(updates)
+            return {"applied": applied, "errors": errors}
+        applied, errors = self.catalog.apply_updates(updates)
+        return {"applied": applied, "errors": errors, "revision": self.catalog.revision}
+    
     def _build_workflow(self):
         workflow = StateGraph(AgentState)
         
@@ -291,63 +382,97 @@ class DealAgent:
     def check_restaurant_status(self, state: AgentState) -> AgentState:
         """Gather restaurant data"""
         print("🔍 Checking restaurant status...")
-        state["restaurants"] = RESTAURANTS
+        user_prefs = state.get("user_request") or {}
         state["current_time"] = datetime.now()
+        # Apply the request filters here so every later stage, including the
+        # LLM prompt, only sees the matching restaurants
+        if DEAL_ENGINE == "sql":
+            restaurants = self.store.opportunity_candidates(
+                state["current_time"].hour, user_prefs.get("cuisine"), user_prefs.get("location")
+            )
+            # Request-local index over the loaded rows; version -1 never matches the shared catalog
+            catalog, rows = CatalogIndex(restaurants, version=-1), None
+        else:
+            catalog = self.catalog.index()
+            rows = catalog.matching_rows(user_prefs.get("cuisine"), user_prefs.get("location"))
+            restaurants = catalog.restaurants if rows is None else [catalog.restaurants[row] for row in rows]
+        state["catalog"] = catalog
+        state["restaurant_rows"] = rows
+        state["restaurants"] = restaurants
         state["detected_opportunities"] = []
+        state["rule_deals"] = None
         state["generated_deals"] = []
         state["llm_insights"] = {}
+        state["insights_age_seconds"] = None
         state["final_deals"] = []  # Initialize here
+        state["deal_summary"] = {}
         return state
 
     def analyze_opportunities(self, state: AgentState) -> AgentState:
         """Identify deal opportunities"""
         print("🤖 Analyzing patterns...")
-        opportunities = []
-        
-        for resto in state["restaurants"]:
-            current_hour = state["current_time"].hour
-            
-            if current_hour >= resto["hours"]["close"] - 2:
-                opportunities.append({
-                    "restaurant_id": resto["id"],
-                    "restaurant_name": resto["name"],
-                    "type": "closing_soon",
-                    "urgency": "high"
-                })
-            
-            if resto["last_hour_sales"] < 3:
-                opportunities.append({
-                    "restaurant_id": resto["id"],
-                    "restaurant_name": resto["name"],
-                    "type": "slow_sales",
-                    "urgency": "medium"
-                })
-                
-            for item, details in resto["inventory"].items():
-                if details["quantity"] < 5:
-                    opportunities.append({
-                        "restaurant_id": resto["id"],
-                        "restaurant_name": resto["name"],
-                        "type": "clear_stock",
-                        "item": item,
-                        "urgency": "high"
-                    })
-        
-        state["detected_opportunities"] = opportunities
+        current_hour = state["current_time"].hour
+        rows = state.get("restaurant_rows")
+        snapshot = self.snapshots.get(current_hour) if DEAL_SNAPSHOTS and DEAL_ENGINE != "sql" else None
+        if snapshot is not None and snapshot.version == state["catalog"].version:
+            if rows is None:
+                state["detected_opportunities"], state["rule_deals"] = snapshot.opportunities, snapshot.deals
+            else:
+                state["detected_opportunities"], state["rule_deals"] = snapshot.for_rows(rows)
+        elif rows is None and state["catalog"].version == self.catalog.version:
+            state["detected_opportunities"] = self._detect_opportunities(state["catalog"], current_hour)
+        else:
+            state["detected_opportunities"] = self._scan_opportunities(state["restaurants"], current_hour)
         return state
 
+    def _detect_opportunities(self, catalog: CatalogIndex, current_hour: int) -> List[Dict]:
+        if DEAL_ENGINE == "incremental":
+            return self.tracker.opportunities(current_hour)
+        if DEAL_ENGINE == "columnar" and catalog_module.np is not None:
+            return self.catalog.columns().detect_opportunities(current_hour)
+        return self._scan_opportunities(catalog.restaurants, current_hour)
+
+    def _build_snapshot(self, catalog: CatalogIndex, current_hour: int) -> Tuple[List[Dict], List[Dict]]:
+        opportunities = self._detect_opportunities(catalog, current_hour)
+        return opportunities, self._rule_deals(catalog, opportunities)
+
+    def _scan_opportunities(self, restaurants: List[Dict], current_hour: int) -> List[Dict]:
+        """Dict-based rule pass, one restaurant at a time"""
+        return [opp for resto in restaurants for opp in restaurant_opportunities(resto, current_hour)]
+
     def llm_analysis(self, state: AgentState) -> AgentState:
         """Cohere-powered strategic insights"""
         print("🧠 Running LLM analysis...")
+        if DEAL_INSIGHTS_MODE == "inline":
+            state["llm_insights"] = self._generate_insights(state["detected_opportunities"], state["current_time"])
+            state["insights_age_seconds"] = 0.0
+        else:
+            user_prefs = state.get("user_request") or {}
+            # One set of insights per effective filter. Only cuisines and cities
+            # the catalog has become part of the key, so arbitrary request
+            # strings cannot grow the set of keys being refreshed
+            catalog = state["catalog"]
+            cuisine = user_prefs.get("cuisine")
+            city = normalize_city(user_prefs.get("location"))
+            filters = (
+                cuisine if isinstance(cuisine, str) and cuisine in catalog.rows_by_cuisine else None,
+                city if city in catalog.rows_by_city else None
+            )
+            state["llm_insights"], state["insights_age_seconds"] = self.insights.read(
+                filters, state["detected_opportunities"]
+            )
+        return state
+
+    def _generate_insights(self, opportunities: List[Dict], current_time: datetime) -> Dict:
         opportunities_text = "\n".join(
             f"{o['restaurant_name']}: {o['type']} (urgency: {o['urgency']})"
-            for o in state["detected_opportunities"]
+            for o in opportunities
         )
         
         prompt = f"""Analyze these restaurant opportunities:
 {opportunities_text}
 
-Current time: {state["current_time"].strftime("%H:%M")}
+Current time: {current_time.strftime("%H:%M")}
 
 Suggest creative deals in JSON format with these keys:
 - "critical" (list of restaurant names that need attention)
@@ -364,24 +489,44 @@ Suggest creative deals in JSON format with these keys:
             response_text = response.generations[0].text
             if '```json' in response_text:
                 response_text = response_text.split('```json')[1].split('```')[0]
-            state["llm_insights"] = json.loads(response_text)
+            return json.loads(response_text)
         except Exception as e:
             print(f"LLM Error: {e}")
-            state["llm_insights"] = {
+            return {
                 "critical": [],
                 "creative_deals": [],
                 "marketing": []
             }
-        return state
 
     def generate_deals(self, state: AgentState) -> AgentState:
         """Generate deals with hybrid logic"""
         print("💡 Creating deals...")
-        deals = []
-        
         # Rule-based deals
-        for opp in state["detected_opportunities"]:
-            resto = next(r for r in state["restaurants"] if r["id"] == opp["restaurant_id"])
+        deals = state.get("rule_deals")
+        if deals is None:
+            deals = self._rule_deals(state["catalog"], state["detected_opportunities"])
+        deals = list(deals)
+        
+        # LLM-enhanced deals
+        if state["llm_insights"].get("creative_deals"):
+            for idea in state["llm_insights"]["creative_deals"]:
+                if isinstance(idea, dict) and "target" in idea:
+                    deals.append({
+                        "restaurant": idea["target"],
+                        "deal": idea.get("type", "Special Offer"),
+                        "type": "innovative",
+                        "rationale": idea.get("rationale", ""),
+                        "urgency": "high"
+                    })
+        
+        state["generated_deals"] = deals
+        return state
+
+    def _rule_deals(self, catalog: CatalogIndex, opportunities: List[Dict]) -> List[Dict]:
+        """Deals for the rule-detected opportunities"""
+        deals = []
+        for opp in opportunities:
+            resto = catalog.get(opp["restaurant_id"])
             discount = 20 + (10 if opp["urgency"] == "high" else 0)
             
             if opp["type"] == "clear_stock":
@@ -401,50 +546,67 @@ Suggest creative deals in JSON format with these keys:
                     "type": opp["type"],
                     "urgency": opp["urgency"]
                 })
-        
-        # LLM-enhanced deals
-        if state["llm_insights"].get("creative_deals"):
-            for idea in state["llm_insights"]["creative_deals"]:
-                if isinstance(idea, dict) and "target" in idea:
-                    deals.append({
-                        "restaurant": idea["target"],
-                        "deal": idea.get("type", "Special Offer"),
-                        "type": "innovative",
-                        "rationale": idea.get("rationale", ""),
-                        "urgency": "high"
-                    })
-        
-        state["generated_deals"] = deals
-        return state
+        return deals
 
     def personalize_recommendations(self, state: AgentState) -> AgentState:
         """Tailor recommendations to user"""
         print("🎯 Personalizing...")
         user_prefs = state.get("user_request", {})
-        
-        if user_prefs.get("cuisine"):
-            filtered_deals = [
-                d for d in state["generated_deals"]
-                if any(r["cuisine"] == user_prefs["cuisine"] 
-                     for r in state["restaurants"] 
-                     if r["name"] == d["restaurant"])
-            ]
+        cuisine = user_prefs.get("cuisine")
+        if not isinstance(cuisine, str):
+            cuisine = None
+        catalog = state["catalog"]
+        # Only string names can match; LLM deal targets and critical entries
+        # may be lists or objects, which are never critical
+        critical_restaurants = {c for c in state["llm_insights"].get("critical", []) if isinstance(c, str)}
+
+        # Filter and aggregate in one pass over the deals
+        filtered_deals = []
+        total_savings = high_priority_count = rating_sum = 0
+        for deal in state["generated_deals"]:
+            if cuisine and not catalog.name_has_cuisine(deal["restaurant"], cuisine):
+                continue
+            filtered_deals.append(deal)
+            if "original_price" in deal and "discounted_price" in deal:
+                total_savings += deal["original_price"] - deal["discounted_price"]
+            if deal["urgency"] == "high":
+                high_priority_count += 1
+            rating_sum += deal.get("rating", 0)
+        state["deal_summary"] = {
+            "total_deals": len(filtered_deals),
+            "total_savings": total_savings,
+            "high_priority_count": high_priority_count,
+            "average_rating": rating_sum / len(filtered_deals) if filtered_deals else 0
+        }
+
+        # Rank by urgency + LLM priority, then the tiebreak; only the requested
+        # page is selected, so the cost grows with offset + limit
+        tiebreak = self._tiebreak(user_prefs.get("seed"), state["current_time"])
+
+        def rank(deal):
+            name = deal["restaurant"]
+            is_critical = isinstance(name, str) and name in critical_restaurants
+            return (deal["urgency"] != "high", not is_critical, tiebreak(deal))
+
+        offset = user_prefs.get("offset") or 0
+        limit = user_prefs.get("limit")
+        if limit is None:
+            ranked = sorted(filtered_deals, key=rank)
         else:
-            filtered_deals = state["generated_deals"]
-        
-        # Sort by urgency + LLM priority
-        critical_restaurants = [c for c in state["llm_insights"].get("critical", [])]
-        state["final_deals"] = sorted(
-            filtered_deals,
-            key=lambda x: (
-                x["urgency"] == "high",
-                x["restaurant"] in critical_restaurants,
-                random.random()
-            ),
-            reverse=True
-        )
+            ranked = heapq.nsmallest(offset + limit, filtered_deals, key=rank)
+        state["final_deals"] = ranked[offset:]
         return state
 
+    def _tiebreak(self, seed, current_time: datetime):
+        """Sort key ordering equally ranked deals (see DEAL_RANKING_MODE)"""
+        if seed is None and DEAL_RANKING_MODE == "seeded":
+            seed = DEAL_RANKING_SEED
+        if seed is None:
+            return lambda deal: random.random()
+        # crc32 rather than hash(), which differs between worker processes
+        salt = f"{seed}:{current_time:%Y-%m-%d %H}:"
+        return lambda deal: zlib.crc32(f"{salt}{deal['restaurant']}:{deal['deal']}".encode())
+
 if __name__ == "__main__":
     agent = DealAgent()
     
@@ -1,6 +1,9 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 import asyncio
+import hashlib
+import json
+import threading
 from agent_01 import SmartFoodAgent, FoodChatBot, Config
 from agent_02 import DealAgent, AgentState
 import os
@@ -8,7 +11,7 @@ from datetime import datetime
 import random
 
 app = Flask(__name__)
-CORS(app)  # Enable CORS for all routes
+CORS(app, expose_headers=["ETag"])  # Enable CORS for all routes; let clients read ETags
 
 # Initialize agents
 config = Config()
@@ -16,11 +19,66 @@ food_agent = SmartFoodAgent()
 food_chatbot = FoodChatBot()
 deal_agent = DealAgent()
 
+# One long-lived event loop per worker process, driven by a background thread.
+# Request threads hand their coroutines to it instead of building a fresh loop
+# per call, so loop setup is paid once and concurrent requests share the loop.
+_event_loop = None
+_event_loop_pid = None
+_event_loop_lock = threading.Lock()
+
+def get_event_loop():
+    """Return this worker's persistent event loop, starting it on first use"""
+    global _event_loop, _event_loop_pid
+    with _event_loop_lock:
+        # gunicorn forks workers after import, so a loop started in the
+        # master (e.g. with --preload) must not be reused by the children
+        if _event_loop is None or _event_loop_pid != os.getpid():
+            _event_loop = asyncio.new_event_loop()
+            _event_loop_pid = os.getpid()
+            threading.Thread(
+                target=_event_loop.run_forever,
+                name="async-loop",
+                daemon=True
+            ).start()
+        return _event_loop
+
 def run_async(coro):
-    """Helper function to run async coroutines in Flask"""
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    return loop.run_until_complete(coro)
+    """Helper function to run async coroutines in Flask on the worker's event loop"""
+    return asyncio.run_coroutine_threadsafe(coro, get_event_loop()).result()
+
+def conditional_json(payload, volatile=("timestamp",)):
+    """JSON response with a content-hash ETag, or 304 if If-None-Match already has it.
+
+    Keys in volatile (timestamps, ages) are left out of the hash, so they alone
+    never change the ETag; the body is serialized once and they are appended.
+    """
+    stable = {key: value for key, value in payload.items() if key not in volatile}
+    body = app.json.dumps(stable, separators=(",", ":"))
+    etag = hashlib.blake2b(body.encode(), digest_size=16).hexdigest()
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        extras = {key: payload[key] for key in volatile if key in payload}
+        if extras:
+            body = body[:-1] + ("," if stable else "") + app.json.dumps(extras, separators=(",", ":"))[1:]
+        response = Response(body, mimetype="application/json")
+    response.set_etag(etag)
+    return response
+
+def client_deadline_ms(data):
+    """The request's deadline_ms, capped at the server budget; ValueError if invalid.
+
+    None when unset. Clients may only tighten the budget, so zero or negative
+    values (which would disable it) are rejected.
+    """
+    deadline_ms = data.get('deadline_ms')
+    if deadline_ms is None:
+        return None
+    if isinstance(deadline_ms, bool) or not isinstance(deadline_ms, int) or deadline_ms <= 0:
+        raise ValueError("deadline_ms must be a positive integer")
+    if config.REQUEST_DEADLINE_MS > 0:
+        deadline_ms = min(deadline_ms, config.REQUEST_DEADLINE_MS)
+    return deadline_ms
 
 @app.route('/api/food/recommendations', methods=['POST'])
 def get_food_recommendations():
@@ -32,12 +90,72 @@ def get_food_recommendations():
         data = request.get_json()
         user_id = data.get('user_id', 'default_user')
         location = data.get('location', 'Mumbai')
+        try:
+            deadline_ms = client_deadline_ms(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         
-        result = run_async(food_agent.recommend_food(user_id, location))
-        return jsonify(result)
+        result = run_async(food_agent.recommend_food(user_id, location, deadline_ms=deadline_ms))
+        return conditional_json(result)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+def iter_async(agen):
+    """Drive an async generator on the worker's event loop from a sync generator"""
+    loop = get_event_loop()
+    try:
+        while True:
+            try:
+                yield asyncio.run_coroutine_threadsafe(agen.__anext__(), loop).result()
+            except StopAsyncIteration:
+                break
+    finally:
+        # Client went away or we finished: let the pipeline clean up
+        asyncio.run_coroutine_threadsafe(agen.aclose(), loop).result()
+
+def sse_event(event, data):
+    """Format one Server-Sent Events frame"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no"  # stop proxies from buffering the stream
+}
+
+@app.route('/api/food/recommendations/stream', methods=['POST'])
+def stream_food_recommendations():
+    """
+    Streaming variant of /api/food/recommendations (Server-Sent Events).
+    Emits context, then each recommendation, then each explanation as it arrives.
+    """
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({"error": "request body must be a JSON object"}), 400
+    user_id = data.get('user_id', 'default_user')
+    location = data.get('location', 'Mumbai')
+    try:
+        deadline_ms = client_deadline_ms(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    def generate():
+        events = food_agent.stream_recommendations(user_id, location, deadline_ms=deadline_ms)
+        for event, payload in iter_async(events):
+            yield sse_event(event, payload)
+    
+    return Response(generate(), mimetype='text/event-stream', headers=SSE_HEADERS)
+
+def demo_chat_response(location):
+    """Canned chat reply used when API keys are not configured"""
+    sample_responses = [
+        f"In {location}, people are loving North Indian cuisine today. Try butter chicken!",
+        f"Based on weather in {location}, I recommend light salads or fresh juices.",
+        f"Popular in {location} right now: street food like pani puri and bhel puri.",
+        f"For {location}, spicy options are trending today - how about some biryani?",
+        f"In {location}, healthy options like quinoa bowls are getting great reviews."
+    ]
+    return random.choice(sample_responses)
+
 @app.route('/api/food/chat', methods=['POST'])
 def chat_about_food():
     """
@@ -50,15 +168,8 @@ def chat_about_food():
         
         # Create a simple response if in demo mode
         if config.is_demo_mode():
-            sample_responses = [
-                f"In {location}, people are loving North Indian cuisine today. Try butter chicken!",
-                f"Based on weather in {location}, I recommend light salads or fresh juices.",
-                f"Popular in {location} right now: street food like pani puri and bhel puri.",
-                f"For {location}, spicy options are trending today - how about some biryani?",
-                f"In {location}, healthy options like quinoa bowls are getting great reviews."
-            ]
             return jsonify({
-                "response": random.choice(sample_responses),
+                "response": demo_chat_response(location),
                 "demo_mode": True
             })
         
@@ -77,6 +188,41 @@ def chat_about_food():
             "demo_mode": True
         }), 500
 
+@app.route('/api/food/chat/stream', methods=['POST'])
+def stream_chat_about_food():
+    """
+    Streaming variant of /api/food/chat (Server-Sent Events).
+    Sends one "delta" event for the greeting and one per recommended dish,
+    then "done". The text is the same as /api/food/chat's; it is sent in
+    those parts, not token by token.
+    """
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({"error": "request body must be a JSON object"}), 400
+    message = data.get('message', '')
+    location = data.get('location', 'Mumbai')
+    
+    def generate():
+        if config.is_demo_mode():
+            yield sse_event("delta", {"text": demo_chat_response(location)})
+            yield sse_event("done", {"demo_mode": True})
+            return
+        try:
+            for text in iter_async(food_chatbot.stream_chat_about_food(message, location)):
+                yield sse_event("delta", {"text": text})
+            yield sse_event("done", {"demo_mode": False})
+        except Exception as e:
+            print(f"Chat stream error: {str(e)}")
+            yield sse_event("error", {
+                "error": str(e),
+                "response": "I'm having trouble answering right now. Please try again later."
+            })
+    
+    return Response(generate(), mimetype='text/event-stream', headers=SSE_HEADERS)
+
+def is_count(value) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool) and value >= 0
+
 @app.route('/api/deals/recommendations', methods=['POST'])
 def get_deal_recommendations():
     """
@@ -86,6 +232,23 @@ def get_deal_recommendations():
         data = request.get_json()
         cuisine = data.get('cuisine', None)
         location = data.get('location', 'Mumbai')  # Added location parameter
+        if cuisine is not None and not isinstance(cuisine, str):
+            return jsonify({"error": "cuisine must be a string"}), 400
+        if location is not None and not isinstance(location, str):
+            return jsonify({"error": "location must be a string"}), 400
+        # Optional pagination over the ranked deals; all of them by default
+        limit, offset = data.get('limit'), data.get('offset', 0)
+        if limit is not None and not is_count(limit):
+            return jsonify({"error": "limit must be a non-negative integer"}), 400
+        if not is_count(offset):
+            return jsonify({"error": "offset must be a non-negative integer"}), 400
+        # Optional tiebreak seed; the same seed returns the same order within an hour
+        seed = data.get('seed')
+        if seed is not None and (isinstance(seed, bool) or not isinstance(seed, (int, str))):
+            return jsonify({"error": "seed must be an integer or string"}), 400
+
+        user_request = {"cuisine": cuisine, "location": location} if cuisine else {"location": location}
+        user_request.update(limit=limit, offset=offset, seed=seed)
 
         # Initialize state with user preferences
         initial_state = AgentState(
@@ -93,10 +256,7 @@ def get_deal_recommendations():
             current_time=datetime.now(),
             detected_opportunities=[],
             generated_deals=[],
-            user_request={
-                "cuisine": cuisine,
-                "location": location
-            } if cuisine else {"location": location},
+            user_request=user_request,
             llm_insights={},
             final_deals=[]
         )
@@ -104,28 +264,22 @@ def get_deal_recommendations():
         # Run the deal agent workflow
         result = deal_agent.workflow.invoke(initial_state)
 
-        # Prepare response with enhanced data
+        # Prepare response with enhanced data; the summary covers every matching deal
+        summary = result.get("deal_summary", {})
         response = {
             "deals": result.get("final_deals", []),
+            "total_deals": summary.get("total_deals", 0),
+            "limit": limit,
+            "offset": offset,
             "marketing_ideas": result.get("llm_insights", {}).get("marketing", []),
-            "total_savings": sum(
-                deal.get("original_price", 0) - deal.get("discounted_price", 0)
-                for deal in result.get("final_deals", [])
-                if "original_price" in deal and "discounted_price" in deal
-            ),
-            "high_priority_count": len([
-                deal for deal in result.get("final_deals", [])
-                if deal.get("urgency") == "high"
-            ]),
-            "average_rating": (
-                sum(deal.get("rating", 0) for deal in result.get("final_deals", [])) /
-                len(result.get("final_deals", []))
-                if result.get("final_deals") else 0
-            ),
+            "insights_age_seconds": result.get("insights_age_seconds"),
+            "total_savings": summary.get("total_savings", 0),
+            "high_priority_count": summary.get("high_priority_count", 0),
+            "average_rating": summary.get("average_rating", 0),
             "timestamp": datetime.now().isoformat()
         }
 
-        return jsonify(response)
+        return conditional_json(response, volatile=("timestamp", "insights_age_seconds"))
     except Exception as e:
         print(f"Error in deals endpoint: {str(e)}")
         return jsonify({
@@ -136,6 +290,21 @@ def get_deal_recommendations():
             "average_rating": 0
         }), 500
 
+@app.route('/api/deals/inventory', methods=['POST'])
+def update_inventory():
+    """
+    Ingest a batch of inventory/sales updates for the deal engine.
+    Body: {"updates": [{"restaurant_id": ..., "last_hour_sales" | "sales_delta": ...,
+           "inventory": {item: {"quantity" | "quantity_delta" | "cost": ...}}}]}
+    """
+    data = request.get_json(silent=True) or {}
+    updates = data.get('updates')
+    if not isinstance(updates, list) or not all(isinstance(u, dict) for u in updates):
+        return jsonify({"error": "updates must be a list of objects"}), 400
+    
+    result = deal_agent.apply_updates(updates)
+    return jsonify(result), (200 if result["applied"] or not updates else 422)
+
 @app.route('/api/system/status', methods=['GET'])
 def system_status():
     """
@@ -145,6 +314,18 @@ def system_status():
         "cohere_api_available": bool(config.COHERE_API_KEY != "demo-key-replace-with-real"),
         "weather_api_available": bool(config.OPENWEATHER_API_KEY != "demo-key-replace-with-real"),
         "demo_mode": config.is_demo_mode(),
+        "weather_cache": food_agent.weather_service.cache_stats(),
+        "festival_cache": food_agent.ai_service.festival_cache.stats(),
+        "trends_cache": food_agent.ai_service.trends_cache.stats(),
+        "chat_cache": food_chatbot.cache_stats(),
+        "coalesced_calls": {
+            "weather": food_agent.weather_service.inflight_stats(),
+            **food_agent.ai_service.inflight_stats()
+        },
+        "opportunity_tracker": deal_agent.tracker.stats(),
+        "deal_snapshots": deal_agent.snapshots.stats(),
+        "deal_insights": deal_agent.insights.stats(),
+        "catalog_writer": deal_agent.catalog.writer.stats() if deal_agent.catalog.writer else None,
         "status": "operational"
     }
     return jsonify(status)
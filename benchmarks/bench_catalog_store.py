@@ -0,0 +1,61 @@
+"""
+Load times for the SQLite catalog store.
+
+Seeds a temporary store with a synthetic catalog of cities, then times a full
+load, a city load, a cuisine + city load and the opportunity-candidate query
+the "sql" deal engine runs per request. Candidate results are checked against
+the in-memory rules.
+
+Usage: python benchmarks/bench_catalog_store.py [--size 50000] [--repeat 5]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_deal_indexes import synthetic_catalog
+from bench_timing import best_of
+from catalog import restaurant_opportunities
+from catalog_store import CatalogStore
+
+CITIES = ["Mumbai", "Delhi", "Bengaluru", "Pune", "Chennai"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(5)
+    restaurants = synthetic_catalog(args.size)
+    for resto in restaurants:
+        resto["city"] = rng.choice(CITIES)
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = CatalogStore(os.path.join(directory, "catalog.db"))
+        start = time.perf_counter()
+        store.seed(restaurants)
+        print(f"seeded {args.size} restaurants in {(time.perf_counter() - start) * 1000:.0f}ms")
+
+        hour = 21
+        expected = [r for r in restaurants if r["cuisine"] == "Indian" and r["city"] == "Mumbai"
+                    and restaurant_opportunities(r, hour)]
+        cases = [
+            ("full load", store.load),
+            ("city=Mumbai", lambda: store.load(None, "Mumbai")),
+            ("Indian in Mumbai", lambda: store.load("Indian", "Mumbai")),
+            ("candidates @21h", lambda: store.opportunity_candidates(hour, "Indian", "Mumbai")),
+        ]
+        for label, fn in cases:
+            rows, seconds = best_of(args.repeat, fn)
+            print(f"  {label:>18}: {len(rows):>6} rows in {seconds * 1000:7.1f}ms")
+        assert store.opportunity_candidates(hour, "Indian", "Mumbai") == expected
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Concurrent inventory/sales ingestion alongside deal reads.
+
+Writer threads apply batches of random quantity and sales deltas to a
+synthetic in-memory catalog (with write-behind persistence to a temporary
+SQLite store) while reader threads run the opportunity tracker and hour
+snapshots, as /api/deals/recommendations does. Reports update and read
+throughput, then checks that the tracker matches a full recompute and that
+the store matches memory after the final flush.
+
+Usage: python benchmarks/bench_catalog_updates.py [--size 20000] [--writers 4] [--readers 2] [--seconds 3]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_deal_indexes import synthetic_catalog
+from catalog import RestaurantCatalog
+from catalog_store import CatalogStore, CatalogWriter
+from opportunities import OpportunityTracker
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", type=int, default=20000)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--readers", type=int, default=2)
+    parser.add_argument("--batch", type=int, default=100)
+    parser.add_argument("--seconds", type=float, default=3)
+    args = parser.parse_args()
+
+    restaurants = synthetic_catalog(args.size)
+    with tempfile.TemporaryDirectory() as directory:
+        store = CatalogStore(os.path.join(directory, "catalog.db"))
+        store.seed(restaurants)
+        catalog = RestaurantCatalog(store.load())
+        catalog.writer = CatalogWriter(store, catalog.record, interval_seconds=0.5)
+        tracker = OpportunityTracker(catalog)
+        tracker.opportunities(20)
+
+        stop = threading.Event()
+        counts = {"updates": 0, "reads": 0}
+        read_latencies = []
+        lock = threading.Lock()
+
+        def writer(seed):
+            rng = random.Random(seed)
+            while not stop.is_set():
+                batch = []
+                for _ in range(args.batch):
+                    resto = restaurants[rng.randrange(args.size)]
+                    item = rng.choice(list(resto["inventory"]))
+                    batch.append({
+                        "restaurant_id": resto["id"],
+                        "sales_delta": rng.choice([-1, 1]),
+                        "inventory": {item: {"quantity_delta": rng.randrange(-3, 4)}}
+                    })
+                applied, errors = catalog.apply_updates(batch)
+                assert not errors, errors
+                with lock:
+                    counts["updates"] += applied
+
+        def reader():
+            while not stop.is_set():
+                start = time.perf_counter()
+                tracker.opportunities(20)
+                elapsed = time.perf_counter() - start
+                with lock:
+                    counts["reads"] += 1
+                    read_latencies.append(elapsed)
+
+        threads = [threading.Thread(target=writer, args=(i,)) for i in range(args.writers)]
+        threads += [threading.Thread(target=reader) for _ in range(args.readers)]
+        for thread in threads:
+            thread.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        catalog.writer.flush()
+        read_latencies.sort()
+        print(f"{args.size} restaurants, {args.writers} writers x {args.batch}-update batches, "
+              f"{args.readers} readers, {args.seconds}s")
+        print(f"  updates: {counts['updates'] / args.seconds:10.0f}/s")
+        print(f"  reads:   {counts['reads'] / args.seconds:10.1f}/s  "
+              f"p50 {read_latencies[len(read_latencies) // 2] * 1000:.2f}ms  "
+              f"p95 {read_latencies[int(len(read_latencies) * 0.95)] * 1000:.2f}ms  "
+              f"max {read_latencies[-1] * 1000:.2f}ms")
+        print(f"  writer:  {catalog.writer.stats()}")
+        print(f"  tracker: {tracker.stats()}")
+        assert tracker.verify(20), "tracker diverged from full recompute"
+        assert store.load() == catalog.index().restaurants, "store differs from memory after flush"
+        print("  tracker and store consistent with memory")
+
+
+if __name__ == "__main__":
+    main()
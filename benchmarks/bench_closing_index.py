@@ -0,0 +1,82 @@
+"""
+Closing-soon lookups: per-hour buckets vs a catalog scan.
+
+Builds synthetic catalogs where a share of the restaurants close past midnight
+(close 24 or later, or a close before the opening hour) and, for every hour of
+the day, compares CatalogIndex.closing_rows with a scan applying the
+closing-soon rule to each restaurant. Both must return the same rows, and the
+SQLite store's bucket table must return them too. Lookup time tracks the
+number of matching restaurants (k), the scan the catalog size.
+
+Usage: python benchmarks/bench_closing_index.py [--sizes 1000,10000,100000] [--repeat 5]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_deal_indexes import synthetic_catalog
+from bench_timing import best_of
+from catalog import HOURS_PER_DAY, CatalogIndex, closing_hours
+from catalog_store import CatalogStore
+
+
+def late_night_catalog(size: int, seed: int = 11):
+    """synthetic_catalog with a quarter of the restaurants closing after midnight"""
+    rng = random.Random(seed)
+    restaurants = synthetic_catalog(size)
+    for resto in restaurants:
+        if rng.random() < 0.25:
+            resto["hours"] = rng.choice([
+                {"open": 17, "close": 24},
+                {"open": 18, "close": 26},
+                {"open": 19, "close": 2},
+                {"open": 20, "close": 3}
+            ])
+    return restaurants
+
+
+def scan_closing_rows(restaurants, hour):
+    return [row for row, resto in enumerate(restaurants) if hour in closing_hours(resto["hours"])]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'restaurants':>12} {'index build':>12} {'avg k':>8} {'lookup/h':>10} {'scan/h':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in (int(s) for s in args.sizes.split(",")):
+            restaurants = late_night_catalog(size)
+            start = time.perf_counter()
+            index = CatalogIndex(restaurants)
+            build_seconds = time.perf_counter() - start
+
+            store = CatalogStore(os.path.join(directory, f"catalog_{size}.db"))
+            store.replace_all(restaurants)
+            row_of = {resto["id"]: row for row, resto in enumerate(restaurants)}
+
+            lookup_total = scan_total = matches = 0
+            for hour in range(HOURS_PER_DAY):
+                rows, lookup_seconds = best_of(args.repeat, index.closing_rows, hour)
+                expected, scan_seconds = best_of(1, scan_closing_rows, restaurants, hour)
+                assert rows == expected, hour
+                # Every closing restaurant must be among the store's candidates
+                candidates = {row_of[resto["id"]] for resto in store.opportunity_candidates(hour)}
+                assert candidates.issuperset(rows), hour
+                lookup_total += lookup_seconds
+                scan_total += scan_seconds
+                matches += len(rows)
+
+            print(f"{size:>12} {build_seconds * 1000:10.1f}ms {matches / HOURS_PER_DAY:>8.0f} "
+                  f"{lookup_total / HOURS_PER_DAY * 1e6:8.1f}us {scan_total / HOURS_PER_DAY * 1000:8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Wire size and server time of /api/deals/recommendations: full reply vs 304.
+
+Serves a synthetic catalog through the Flask test client with seeded ranking
+and inline (offline) insights, then repeats the same request with and without
+the ETag from the first reply. Repeated requests must get the same ETag, and
+the conditional ones a 304 without a body.
+
+Usage: python benchmarks/bench_conditional_deals.py [--size 20000] [--requests 20] [--limit 0]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import agent_02
+import app
+from bench_deal_indexes import synthetic_catalog
+from catalog import RestaurantCatalog
+
+
+class OfflineCohere:
+    def generate(self, **kwargs):
+        raise RuntimeError("offline benchmark")
+
+
+def run_requests(client, count, body, headers):
+    responses = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for _ in range(count):
+            responses.append(client.post("/api/deals/recommendations", json=body, headers=headers))
+        elapsed = time.perf_counter() - start
+    return responses, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=0, help="page size (0 returns every deal)")
+    args = parser.parse_args()
+
+    agent_02.co = OfflineCohere()
+    agent_02.DEAL_INSIGHTS_MODE = "inline"
+    agent_02.DEAL_RANKING_MODE = "seeded"
+    app.deal_agent = agent_02.DealAgent(RestaurantCatalog(synthetic_catalog(args.size)))
+    client = app.app.test_client()
+    body = {"location": "Mumbai", "limit": args.limit or None}
+
+    full, full_seconds = run_requests(client, args.requests, body, {})
+    etag = full[0].headers["ETag"]
+    assert all(r.status_code == 200 and r.headers["ETag"] == etag for r in full)
+    cached, cached_seconds = run_requests(client, args.requests, body, {"If-None-Match": etag})
+    assert all(r.status_code == 304 and not r.data for r in cached)
+
+    print(f"{args.size} restaurants, {full[0].get_json()['total_deals']} deals, limit={args.limit or 'all'}")
+    print(f"  200 reply: {len(full[0].data):>9} bytes  {full_seconds / args.requests * 1000:8.2f}ms per request")
+    print(f"  304 reply: {len(cached[0].data):>9} bytes  {cached_seconds / args.requests * 1000:8.2f}ms per request")
+
+
+if __name__ == "__main__":
+    main()
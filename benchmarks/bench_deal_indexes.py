@@ -0,0 +1,139 @@
+"""
+Restaurant lookup cost in DealAgent.generate_deals and personalize_recommendations.
+
+Builds synthetic catalogs of 10^2 .. 10^5 restaurants and times the two nodes
+with the catalog indexes against the original linear scans (one scan of the
+catalog per opportunity and per deal). The LLM stage is skipped; both paths
+get the same detected opportunities and produce the same deals.
+
+Usage: python benchmarks/bench_deal_indexes.py [--sizes 100,1000,10000,100000] [--legacy-max 10000]
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent_02 import DealAgent
+from catalog import RestaurantCatalog
+
+CUISINES = ["Indian", "Chinese", "Italian", "Mexican", "Thai", "Desserts", "Barbecue", "Japanese"]
+
+
+def synthetic_catalog(size: int, seed: int = 7):
+    rng = random.Random(seed)
+    restaurants = []
+    for i in range(size):
+        restaurants.append({
+            "id": f"resto_{i}",
+            "name": f"Restaurant {i}",
+            "cuisine": rng.choice(CUISINES),
+            "inventory": {
+                f"Dish {j}": {"cost": rng.randrange(20, 400), "quantity": rng.randrange(0, 20)}
+                for j in range(rng.randrange(1, 4))
+            },
+            "hours": {"open": rng.randrange(7, 13), "close": rng.randrange(20, 25)},
+            "rating": round(rng.uniform(3.0, 5.0), 1),
+            "last_hour_sales": rng.randrange(0, 12)
+        })
+    return restaurants
+
+
+def legacy_generate_deals(state):
+    """The original rule-based loop: a catalog scan per opportunity"""
+    deals = []
+    for opp in state["detected_opportunities"]:
+        resto = next(r for r in state["restaurants"] if r["id"] == opp["restaurant_id"])
+        discount = 20 + (10 if opp["urgency"] == "high" else 0)
+        if opp["type"] == "clear_stock":
+            item = opp["item"]
+            deals.append({
+                "restaurant": resto["name"],
+                "deal": f"{discount}% off {item}",
+                "type": "clearance",
+                "urgency": opp["urgency"],
+                "original_price": resto["inventory"][item]["cost"],
+                "discounted_price": round(resto["inventory"][item]["cost"] * (1 - discount/100))
+            })
+        else:
+            deals.append({
+                "restaurant": resto["name"],
+                "deal": f"{discount}% off all menu",
+                "type": opp["type"],
+                "urgency": opp["urgency"]
+            })
+    return deals
+
+
+def legacy_filter_by_cuisine(state, cuisine):
+    """The original personalize filter: a catalog scan per deal"""
+    return [
+        d for d in state["generated_deals"]
+        if any(r["cuisine"] == cuisine for r in state["restaurants"] if r["name"] == d["restaurant"])
+    ]
+
+
+def build_state(restaurants):
+    agent = DealAgent(RestaurantCatalog(restaurants))
+    catalog = agent.catalog.index()
+    state = {
+        "restaurants": catalog.restaurants,
+        "catalog": catalog,
+        "current_time": datetime(2024, 1, 1, 21, 0),
+        "detected_opportunities": [],
+        "generated_deals": [],
+        "user_request": {"cuisine": "Indian"},
+        "llm_insights": {},
+        "final_deals": []
+    }
+    state = agent.analyze_opportunities(state)
+    # Time generate_deals' own lookups rather than a prebuilt snapshot
+    state["rule_deals"] = None
+    return agent, state
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="100,1000,10000,100000")
+    parser.add_argument("--legacy-max", type=int, default=10000,
+                        help="largest catalog to run the quadratic legacy path on")
+    args = parser.parse_args()
+
+    print(f"{'restaurants':>12} {'opps':>8} {'index build':>12} {'indexed':>10} {'legacy':>10}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        restaurants = synthetic_catalog(size)
+        _, build_seconds = timed(lambda: RestaurantCatalog(restaurants).index())
+        with contextlib.redirect_stdout(io.StringIO()):
+            agent, state = build_state(restaurants)
+            start = time.perf_counter()
+            state = agent.generate_deals(state)
+            state = agent.personalize_recommendations(state)
+            indexed_seconds = time.perf_counter() - start
+
+        legacy = "skipped"
+        if size <= args.legacy_max:
+            start = time.perf_counter()
+            deals = legacy_generate_deals(state)
+            filtered = legacy_filter_by_cuisine(dict(state, generated_deals=deals), "Indian")
+            legacy_seconds = time.perf_counter() - start
+            assert deals == state["generated_deals"]
+            assert sorted(map(repr, filtered)) == sorted(map(repr, state["final_deals"]))
+            legacy = f"{legacy_seconds * 1000:8.1f}ms"
+
+        print(f"{size:>12} {len(state['detected_opportunities']):>8} "
+              f"{build_seconds * 1000:10.1f}ms {indexed_seconds * 1000:8.1f}ms {legacy:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Deal ranking and response summary: full sort vs top-K selection.
+
+Builds the generated deals for a synthetic catalog once, then times the
+original personalize step (full sort with a random tiebreak) plus the five
+summary passes app.py used to make, against personalize_recommendations with
+a limit, which selects the page with a heap and aggregates in the same pass
+as the cuisine filter. Both timings include serializing the deals returned.
+Both must report the same summary, and the page must hold the top-ranked
+deals.
+
+Usage: python benchmarks/bench_deal_ranking.py [--size 100000] [--limit 20] [--repeat 5]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent_02 import DealAgent
+from bench_deal_indexes import synthetic_catalog
+from bench_timing import best_of
+from catalog import RestaurantCatalog
+
+
+def legacy_personalize(state, cuisine):
+    """The original personalize sort plus app.py's summary passes"""
+    catalog = state["catalog"]
+    filtered = [d for d in state["generated_deals"] if catalog.name_has_cuisine(d["restaurant"], cuisine)]
+    critical = [c for c in state["llm_insights"].get("critical", [])]
+    final = sorted(
+        filtered,
+        key=lambda x: (x["urgency"] == "high", x["restaurant"] in critical, random.random()),
+        reverse=True
+    )
+    summary = {
+        "total_deals": len(final),
+        "total_savings": sum(
+            d.get("original_price", 0) - d.get("discounted_price", 0)
+            for d in final if "original_price" in d and "discounted_price" in d
+        ),
+        "high_priority_count": len([d for d in final if d.get("urgency") == "high"]),
+        "average_rating": sum(d.get("rating", 0) for d in final) / len(final) if final else 0
+    }
+    json.dumps(final)
+    return final, summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", type=int, default=100000)
+    parser.add_argument("--cuisine", default="Indian")
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    agent = DealAgent(RestaurantCatalog(synthetic_catalog(args.size)))
+    with contextlib.redirect_stdout(io.StringIO()):
+        state = agent.check_restaurant_status({"user_request": {}})
+        state = agent.analyze_opportunities(state)
+        state = agent.generate_deals(state)
+    high_urgency = lambda deal: deal["urgency"] == "high"
+
+    def top_k():
+        with contextlib.redirect_stdout(io.StringIO()):
+            page_state = dict(state, user_request={"cuisine": args.cuisine, "limit": args.limit})
+            page_state = agent.personalize_recommendations(page_state)
+        json.dumps(page_state["final_deals"])
+        return page_state["final_deals"], page_state["deal_summary"]
+
+    (legacy_deals, legacy_summary), legacy_seconds = best_of(args.repeat, legacy_personalize, state, args.cuisine)
+    (page, summary), top_k_seconds = best_of(args.repeat, top_k)
+    assert summary == legacy_summary, (summary, legacy_summary)
+    assert len(page) == min(args.limit, len(legacy_deals))
+    assert list(map(high_urgency, page)) == list(map(high_urgency, legacy_deals[:len(page)]))
+
+    print(f"{args.size} restaurants, {len(state['generated_deals'])} deals, "
+          f"{summary['total_deals']} matching cuisine={args.cuisine}, limit={args.limit}")
+    print(f"  full sort + summary passes: {legacy_seconds * 1000:8.2f}ms")
+    print(f"  top-K + one-pass summary:   {top_k_seconds * 1000:8.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
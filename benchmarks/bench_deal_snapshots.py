@@ -0,0 +1,63 @@
+"""
+Per-request cost of the deal pipeline with and without hour snapshots.
+
+Runs the non-LLM nodes of DealAgent (check_status, analyze_ops, create_deals,
+personalize) for a burst of requests against a synthetic catalog, first
+rebuilding the rule-based deals per request and then serving them from the
+hour snapshot. Final deals must match between the two modes.
+
+Usage: python benchmarks/bench_deal_snapshots.py [--size 100000] [--requests 50]
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import agent_02
+from agent_02 import DealAgent
+from bench_deal_indexes import synthetic_catalog
+from catalog import RestaurantCatalog
+
+
+def run_requests(agent, count, cuisine):
+    results = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for _ in range(count):
+            state = agent.check_restaurant_status({"user_request": {"cuisine": cuisine}})
+            state = agent.analyze_opportunities(state)
+            state = agent.generate_deals(state)
+            state = agent.personalize_recommendations(state)
+            results.append(state["final_deals"])
+        elapsed = time.perf_counter() - start
+    return results, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", type=int, default=100000)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--cuisine", default="Indian")
+    args = parser.parse_args()
+
+    catalog = RestaurantCatalog(synthetic_catalog(args.size))
+    key = lambda deal: (deal["restaurant"], deal["deal"])
+    timings = {}
+    for snapshots in (False, True):
+        agent_02.DEAL_SNAPSHOTS = snapshots
+        agent = DealAgent(catalog)
+        results, elapsed = run_requests(agent, args.requests, args.cuisine)
+        timings[snapshots] = (sorted(results[-1], key=key), elapsed)
+
+    assert timings[False][0] == timings[True][0]
+    print(f"{args.size} restaurants, {args.requests} requests, cuisine={args.cuisine}")
+    print(f"  per-request rebuild: {timings[False][1] / args.requests * 1000:8.2f}ms per request")
+    print(f"  hour snapshot:       {timings[True][1] / args.requests * 1000:8.2f}ms per request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Throughput comparison for the Flask async bridge.
+
+Runs /api/food/recommendations through the Flask test client from a pool of
+threads (the same shape as a gunicorn gthread worker) twice: once with the old
+per-request event loop and once with the persistent per-worker loop. Runs in
+demo mode so the numbers reflect serving overhead rather than API latency.
+
+Usage: python benchmarks/bench_event_loop.py [--requests 500] [--threads 8]
+"""
+import argparse
+import asyncio
+import gc
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Force demo mode before the agents read their configuration
+os.environ["COHERE_API_KEY"] = ""
+os.environ["OPENWEATHER_API_KEY"] = ""
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import logging
+logging.disable(logging.INFO)
+
+import app as flask_app
+
+
+def legacy_run_async(coro):
+    """The original bridge: a brand-new loop per call that is never closed"""
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    return loop.run_until_complete(coro)
+
+
+def open_fds() -> int:
+    try:
+        return len(os.listdir("/proc/self/fd"))
+    except OSError:
+        return -1
+
+
+def run(label: str, bridge, total: int, threads: int) -> None:
+    flask_app.run_async = bridge
+    client = flask_app.app.test_client()
+
+    def call(_):
+        response = client.post("/api/food/recommendations", json={"location": "Mumbai"})
+        assert response.status_code == 200, response.status_code
+
+    call(0)  # warm up
+    gc.collect()
+    fds_before = open_fds()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(call, range(total)))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<22} {total / elapsed:8.1f} req/s   "
+          f"{elapsed * 1000 / total:6.2f} ms/req   "
+          f"fds +{open_fds() - fds_before}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    original_bridge = flask_app.run_async
+    run("per-request loop", legacy_run_async, args.requests, args.threads)
+    run("persistent loop", original_bridge, args.requests, args.threads)
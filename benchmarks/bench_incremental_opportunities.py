@@ -0,0 +1,69 @@
+"""
+Incremental opportunity tracking vs full recomputes.
+
+Simulates a day of deal requests against a synthetic catalog: between reads a
+batch of restaurants gets new inventory quantities and sales, and the hour
+advances every few reads (including the 23 -> 0 rollover). Each read is timed
+through OpportunityTracker and through the full dict and columnar engines, and
+the tracker's output is checked against the full recompute every time.
+
+Usage: python benchmarks/bench_incremental_opportunities.py [--size 100000] [--updates 50] [--reads 96]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_deal_indexes import synthetic_catalog
+from catalog import RestaurantCatalog, np
+from opportunities import OpportunityTracker
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", type=int, default=100000)
+    parser.add_argument("--updates", type=int, default=50, help="restaurants updated between reads")
+    parser.add_argument("--reads", type=int, default=96, help="reads, four per hour")
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    catalog = RestaurantCatalog(synthetic_catalog(args.size))
+    tracker = OpportunityTracker(catalog)
+    tracker.opportunities(18)
+
+    totals = {"incremental": 0.0, "full scan": 0.0, "columnar": 0.0}
+    for read in range(args.reads):
+        hour = (18 + read // 4) % 24
+        for _ in range(args.updates):
+            resto = catalog.index().restaurants[rng.randrange(args.size)]
+            item = rng.choice(list(resto["inventory"]))
+            catalog.update_restaurant(resto["id"], inventory={item: {"quantity": rng.randrange(0, 20)}},
+                                      last_hour_sales=rng.randrange(0, 12))
+
+        start = time.perf_counter()
+        tracked = tracker.opportunities(hour)
+        totals["incremental"] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        expected = tracker.full_recompute(hour)
+        totals["full scan"] += time.perf_counter() - start
+
+        if np is not None:
+            start = time.perf_counter()
+            columnar = catalog.columns().detect_opportunities(hour)
+            totals["columnar"] += time.perf_counter() - start
+            assert columnar == expected, f"columnar mismatch at read {read}"
+        assert tracked == expected, f"incremental mismatch at read {read} (hour {hour})"
+
+    print(f"{args.size} restaurants, {args.updates} updates between reads, {args.reads} reads")
+    for engine, seconds in totals.items():
+        if seconds:
+            print(f"  {engine:>12}: {seconds / args.reads * 1000:8.2f}ms per read")
+    print(f"  tracker stats: {tracker.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,12 @@
+"""Timing helper shared by the benchmark scripts."""
+import time
+
+
+def best_of(repeat, fn, *args):
+    """Run fn(*args) repeat times; return the last result and the fastest time in seconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return result, best
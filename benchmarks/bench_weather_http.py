@@ -0,0 +1,102 @@
+"""
+Connection-reuse micro-benchmark for WeatherService.
+
+Starts a local keep-alive HTTP stub that answers like OpenWeatherMap and times
+sequential lookups three ways: module-level requests.get (a new connection per
+call, the old behaviour), the pooled requests session, and the pooled aiohttp
+session. The weather cache is bypassed so every lookup hits the stub. A local
+stub has no DNS or TLS cost, so real-world savings are larger than shown here.
+
+Usage: python benchmarks/bench_weather_http.py [--calls 1000]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Real-looking keys so WeatherService does not short-circuit to demo data
+os.environ["COHERE_API_KEY"] = os.environ.get("COHERE_API_KEY") or "bench-key"
+os.environ["OPENWEATHER_API_KEY"] = os.environ.get("OPENWEATHER_API_KEY") or "bench-key"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import logging
+logging.disable(logging.INFO)
+
+import requests
+from agent_01 import WeatherService
+
+STUB_BODY = json.dumps({
+    "weather": [{"main": "Clear", "description": "clear sky"}],
+    "main": {"temp": 28.4, "feels_like": 30.1, "humidity": 65},
+    "name": "Mumbai",
+    "sys": {"country": "IN"}
+}).encode()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    disable_nagle_algorithm = True
+    wbufsize = 65536  # send headers and body in one segment
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(STUB_BODY)))
+        self.end_headers()
+        self.wfile.write(STUB_BODY)
+
+    def log_message(self, *args):
+        pass
+
+
+class CountingServer(ThreadingHTTPServer):
+    daemon_threads = True
+    connections = 0
+
+    def process_request(self, request, client_address):
+        self.connections += 1
+        super().process_request(request, client_address)
+
+
+def report(label: str, server: CountingServer, calls: int, elapsed: float) -> None:
+    print(f"{label:<22} {elapsed * 1e6 / calls:8.1f} µs/call   "
+          f"{calls / elapsed:8.0f} calls/s   {server.connections} TCP connections")
+    server.connections = 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=1000)
+    args = parser.parse_args()
+
+    server = CountingServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    service = WeatherService("bench-key")
+    service.base_url = f"http://127.0.0.1:{server.server_port}/data/2.5/weather"
+
+    start = time.perf_counter()
+    for _ in range(args.calls):
+        response = requests.get(service.base_url, params=service._request_params("Mumbai"), timeout=10)
+        service._parse_weather_response(response.json(), "Mumbai")
+    report("requests.get", server, args.calls, time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for _ in range(args.calls):
+        service._fetch_weather_data("Mumbai")
+    report("pooled session", server, args.calls, time.perf_counter() - start)
+
+    async def run_async():
+        start = time.perf_counter()
+        for _ in range(args.calls):
+            await service._afetch_weather_data("Mumbai")
+        elapsed = time.perf_counter() - start
+        await service._async_session.close()
+        return elapsed
+
+    report("pooled aiohttp", server, args.calls, asyncio.run(run_async()))
+    server.shutdown()
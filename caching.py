@@ -0,0 +1,396 @@
+import asyncio
+import json
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, Hashable, List, Optional, Tuple
+
+
+class TTLCache:
+    """Thread-safe in-process cache whose entries go stale after a TTL.
+
+    Stale entries are kept (up to max_stale_seconds past their TTL) so callers
+    can keep serving them while a single background refresh runs. The least
+    recently used entry is evicted once max_entries is reached.
+    """
+
+    def __init__(self, ttl_seconds: float, max_stale_seconds: float = 0, max_entries: int = 256):
+        self.ttl_seconds = ttl_seconds
+        self.max_stale_seconds = max_stale_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "refresh_failures": 0}
+
+    def lookup(self, key: Hashable) -> Tuple[Optional[Any], str]:
+        """Return (value, status) where status is "fresh", "stale" or "miss" """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, stored_at = entry
+                age = now - stored_at
+                if age <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return value, "fresh"
+                if age <= self.ttl_seconds + self.max_stale_seconds:
+                    self._entries.move_to_end(key)
+                    self._stats["stale_hits"] += 1
+                    return value, "stale"
+                del self._entries[key]
+            self._stats["misses"] += 1
+            return None, "miss"
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the fresh value for key, or None"""
+        value, status = self.lookup(key)
+        return value if status == "fresh" else None
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def begin_refresh(self, key: Hashable) -> bool:
+        """Claim the refresh slot for key; False if a refresh is already running"""
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            self._stats["refreshes"] += 1
+            return True
+
+    def end_refresh(self, key: Hashable, value: Any = None, failed: bool = False) -> None:
+        """Release the refresh slot, storing the new value unless the refresh failed"""
+        if not failed:
+            self.set(key, value)
+        with self._lock:
+            self._refreshing.discard(key)
+            if failed:
+                self._stats["refresh_failures"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["stale_hits"] + stats["misses"]
+        stats["hit_ratio"] = round((stats["hits"] + stats["stale_hits"]) / lookups, 4) if lookups else 0.0
+        stats["ttl_seconds"] = self.ttl_seconds
+        return stats
+
+
+def thread_connection(local: threading.local, path: str) -> sqlite3.Connection:
+    """The calling thread's WAL-mode connection to path, opened on first use.
+
+    sqlite3 connections are not thread-safe, so each thread keeps its own in
+    local. Connections must not cross a fork either, so forked workers open
+    their own.
+    """
+    conn = getattr(local, "conn", None)
+    if conn is None or local.pid != os.getpid():
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(path, timeout=5)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        local.conn = conn
+        local.pid = os.getpid()
+    return conn
+
+
+class PersistentCache:
+    """SQLite-backed key/value cache shared by every process on the host.
+
+    Values are stored as JSON under a text primary key, so a lookup is a single
+    indexed read. The database runs in WAL mode so gunicorn workers can read
+    concurrently while one of them writes.
+    """
+
+    def __init__(self, path: str, table: str = "cache", max_age_seconds: Optional[float] = None):
+        self.path = path
+        self.table = table
+        self.max_age_seconds = max_age_seconds
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "writes": 0}
+        with self._connect() as conn:
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return thread_connection(self._local, self.path)
+
+    def get(self, key: str) -> Optional[Any]:
+        row = self._connect().execute(
+            f"SELECT value, updated_at FROM {self.table} WHERE key = ?", (key,)
+        ).fetchone()
+        fresh = row is not None and (
+            self.max_age_seconds is None or time.time() - row[1] <= self.max_age_seconds
+        )
+        with self._lock:
+            self._stats["hits" if fresh else "misses"] += 1
+        return json.loads(row[0]) if fresh else None
+
+    def set(self, key: str, value: Any) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, updated_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time())
+            )
+        with self._lock:
+            self._stats["writes"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        stats["path"] = self.path
+        return stats
+
+
+class DaemonWorker:
+    """A daemon thread running target, started on first use.
+
+    Threads do not survive a fork, so each gunicorn worker starts its own;
+    a thread that died is replaced as well.
+    """
+
+    def __init__(self, target: Callable[[], None], name: str):
+        self.target = target
+        self.name = name
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+
+    def ensure_started(self) -> None:
+        """Start the thread unless this process already runs it; callers serialize this"""
+        if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self.target, name=self.name, daemon=True)
+            self._pid = os.getpid()
+            self._thread.start()
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key into one upstream call.
+
+    While a call for a key is in flight, later callers with the same key wait
+    for its result instead of starting their own. do() coordinates threads and
+    ado() coordinates coroutines on the same event loop.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, "_Call"] = {}
+        self._tasks: Dict[Tuple[Any, Hashable], "asyncio.Future"] = {}
+        self._stats = {"calls": 0, "deduplicated": 0}
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._stats["calls"] += 1
+            else:
+                self._stats["deduplicated"] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def ado(self, key: Hashable, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        loop = asyncio.get_running_loop()
+        task_key = (loop, key)
+        with self._lock:
+            task = self._tasks.get(task_key)
+            if task is None:
+                task = self._tasks[task_key] = loop.create_task(fn(*args, **kwargs))
+                task.add_done_callback(lambda _: self._forget(task_key))
+                self._stats["calls"] += 1
+            else:
+                self._stats["deduplicated"] += 1
+        # shield: one caller timing out must not cancel the call for the others
+        return await asyncio.shield(task)
+
+    def _forget(self, task_key: Tuple[Any, Hashable]) -> None:
+        with self._lock:
+            self._tasks.pop(task_key, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = len(self._calls) + len(self._tasks)
+        return stats
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+# Words that carry no intent in a food request; dropping them lets
+# "I'm hungry, what should I eat?" and "im hungry what to eat" match
+STOP_WORDS = frozenset("""
+a an and are am be can could do does for from give have i i'd i'll i'm im id
+is it me my of on or please should some something suggest tell the to want
+what whats what's which would you your
+""".split())
+
+_MERSENNE_PRIME = (1 << 61) - 1
+
+
+def normalize_tokens(text: str) -> FrozenSet[str]:
+    """Lowercased word set with apostrophes folded and stop words removed"""
+    words = re.findall(r"[a-z0-9]+", text.lower().replace("'", "").replace("\u2019", ""))
+    return frozenset(word for word in words if word not in STOP_WORDS)
+
+
+class SimilarityCache:
+    """Cache that answers near-duplicate messages with a recent stored value.
+
+    Messages are reduced to normalized token sets. MinHash signatures split
+    into LSH bands find candidate entries without scanning the cache, and a
+    candidate is a hit when its exact Jaccard similarity with the new message
+    reaches the threshold. Entries are partitioned by scope (e.g. location),
+    expire after ttl_seconds and are evicted least recently used first once
+    max_entries or max_bytes is exceeded.
+    """
+
+    def __init__(self, threshold: float = 0.8, ttl_seconds: float = 600, max_entries: int = 512,
+                 max_bytes: int = 2_000_000, num_perm: int = 64, bands: int = 16):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.bands = bands
+        self.rows = num_perm // bands
+        rng = random.Random(1)
+        self._perms = [(rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+                       for _ in range(num_perm)]
+        self._entries: "OrderedDict[int, _SimilarEntry]" = OrderedDict()
+        self._buckets: Dict[Tuple[Hashable, int, Tuple[int, ...]], set] = {}
+        self._next_id = 0
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "llm_calls_saved": 0}
+
+    def get(self, text: str, scope: Hashable = None) -> Optional[Any]:
+        tokens = normalize_tokens(text)
+        if not tokens:
+            with self._lock:
+                self._stats["misses"] += 1
+            return None
+        bands = self._bands(tokens)
+        now = time.monotonic()
+        with self._lock:
+            best, best_score = None, self.threshold
+            for entry_id in self._candidates(scope, bands):
+                entry = self._entries[entry_id]
+                if now - entry.stored_at > self.ttl_seconds:
+                    continue
+                score = len(tokens & entry.tokens) / len(tokens | entry.tokens)
+                if score >= best_score:
+                    best, best_score = entry, score
+            if best is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(best.entry_id)
+            self._stats["hits"] += 1
+            self._stats["llm_calls_saved"] += best.llm_calls
+            return best.value
+
+    def set(self, text: str, value: Any, scope: Hashable = None, llm_calls: int = 0) -> None:
+        """Store value for text; llm_calls is what producing it cost, credited on each hit"""
+        tokens = normalize_tokens(text)
+        if not tokens:
+            return
+        bands = self._bands(tokens)
+        size = len(json.dumps(value, default=str)) + sum(len(token) for token in tokens)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            entry = _SimilarEntry(self._next_id, scope, tokens, bands, value, llm_calls, size)
+            self._next_id += 1
+            self._entries[entry.entry_id] = entry
+            self._bytes += size
+            for band in self._band_keys(scope, bands):
+                self._buckets.setdefault(band, set()).add(entry.entry_id)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._evict_oldest()
+
+    def _candidates(self, scope: Hashable, bands: List[Tuple[int, ...]]) -> set:
+        candidates = set()
+        for band in self._band_keys(scope, bands):
+            candidates |= self._buckets.get(band, set())
+        return candidates
+
+    def _band_keys(self, scope: Hashable, bands: List[Tuple[int, ...]]):
+        return [(scope, index, band) for index, band in enumerate(bands)]
+
+    def _bands(self, tokens: FrozenSet[str]) -> List[Tuple[int, ...]]:
+        hashes = [hash(token) & _MERSENNE_PRIME for token in tokens]
+        signature = [min((a * h + b) % _MERSENNE_PRIME for h in hashes) for a, b in self._perms]
+        return [tuple(signature[i:i + self.rows]) for i in range(0, len(signature), self.rows)]
+
+    def _evict_oldest(self) -> None:
+        _, entry = self._entries.popitem(last=False)
+        self._bytes -= entry.size
+        for band in self._band_keys(entry.scope, entry.bands):
+            bucket = self._buckets.get(band)
+            if bucket is not None:
+                bucket.discard(entry.entry_id)
+                if not bucket:
+                    del self._buckets[band]
+        self._stats["evictions"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self._bytes
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        stats["threshold"] = self.threshold
+        return stats
+
+
+class _SimilarEntry:
+    __slots__ = ("entry_id", "scope", "tokens", "bands", "value", "llm_calls", "size", "stored_at")
+
+    def __init__(self, entry_id, scope, tokens, bands, value, llm_calls, size):
+        self.entry_id = entry_id
+        self.scope = scope
+        self.tokens = tokens
+        self.bands = bands
+        self.value = value
+        self.llm_calls = llm_calls
+        self.size = size
+        self.stored_at = time.monotonic()
@@ -0,0 +1,437 @@
+import math
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # the columnar engine is optional; callers fall back to dict scans
+    np = None
+
+# Opportunity rules shared by the dict and columnar engines
+CLOSING_SOON_HOURS = 2
+SLOW_SALES_THRESHOLD = 3
+LOW_STOCK_THRESHOLD = 5
+
+HOURS_PER_DAY = 24
+
+# How many record updates the catalog remembers for incremental consumers
+CHANGE_LOG_SIZE = 10000
+
+# Record updates lock one of these stripes (by row) instead of the whole catalog
+UPDATE_LOCK_STRIPES = 64
+
+
+def normalize_city(city: Optional[str]) -> Optional[str]:
+    """Lookup key for a city; None (no filter) for blanks and non-strings"""
+    return " ".join(city.lower().split()) or None if isinstance(city, str) else None
+
+
+def _number(value: Any, field: str, minimum: Optional[float] = None) -> Any:
+    # JSON bodies may carry NaN and Infinity, which no comparison can rank
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise ValueError(f"{field} must be a finite number")
+    if minimum is not None and value < minimum:
+        raise ValueError(f"{field} must be at least {minimum}")
+    return value
+
+
+def update_restaurant_id(update: Any) -> str:
+    """The restaurant an update targets; ValueError unless it is an object with a string id"""
+    if not isinstance(update, dict):
+        raise ValueError("update must be an object")
+    restaurant_id = update.get("restaurant_id")
+    if not isinstance(restaurant_id, str):
+        raise ValueError("restaurant_id must be a string")
+    return restaurant_id
+
+
+def apply_update(resto: Dict[str, Any], update: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of resto with one inventory/sales update applied.
+
+    update may set "last_hour_sales" or add "sales_delta", and per item in
+    "inventory" set "quantity" / "cost" or add "quantity_delta". Deltas never
+    take a value below zero. Unknown items raise KeyError; malformed updates,
+    non-finite numbers and negative absolute values raise ValueError. resto
+    itself is never modified.
+    """
+    resto = dict(resto)
+    inventory = update.get("inventory")
+    if inventory is not None and not isinstance(inventory, dict):
+        raise ValueError("inventory must be an object")
+    if inventory:
+        items = dict(resto["inventory"])
+        for item, fields in inventory.items():
+            if not isinstance(fields, dict):
+                raise ValueError(f"inventory[{item!r}] must be an object")
+            details = dict(items[item])
+            if "quantity" in fields:
+                details["quantity"] = _number(fields["quantity"], "quantity", minimum=0)
+            if "quantity_delta" in fields:
+                details["quantity"] = max(0, details["quantity"] + _number(fields["quantity_delta"], "quantity_delta"))
+            if "cost" in fields:
+                details["cost"] = _number(fields["cost"], "cost", minimum=0)
+            items[item] = details
+        resto["inventory"] = items
+    if update.get("last_hour_sales") is not None:
+        resto["last_hour_sales"] = _number(update["last_hour_sales"], "last_hour_sales", minimum=0)
+    if update.get("sales_delta"):
+        resto["last_hour_sales"] = max(0, resto["last_hour_sales"] + _number(update["sales_delta"], "sales_delta"))
+    return resto
+
+
+def closing_hours(hours: Dict[str, Any]) -> List[int]:
+    """Hours of the day (0-23) in which a restaurant is open and closes within CLOSING_SOON_HOURS.
+
+    A close at or before the opening hour is past midnight (open 18, close 2),
+    and closes of 24 or later wrap onto the next day, so "close": 24 covers
+    hours 22 and 23 and "close": 26 hours 0 and 1.
+    """
+    open_hour, close_hour = hours["open"], hours["close"]
+    if close_hour <= open_hour:
+        close_hour += HOURS_PER_DAY
+    start = max(open_hour, close_hour - CLOSING_SOON_HOURS)
+    return [hour % HOURS_PER_DAY for hour in range(math.ceil(start), math.ceil(close_hour))]
+
+
+def closing_buckets(restaurants: List[Dict[str, Any]]) -> List[List[int]]:
+    """Sorted rows per hour of the day whose closing window covers that hour"""
+    buckets = [[] for _ in range(HOURS_PER_DAY)]
+    for row, resto in enumerate(restaurants):
+        for hour in closing_hours(resto["hours"]):
+            buckets[hour].append(row)
+    return buckets
+
+
+def restaurant_opportunities(resto: Dict[str, Any], current_hour: int) -> List[Dict[str, Any]]:
+    """Deal opportunities for one restaurant at the given hour"""
+    opportunities = []
+    
+    if current_hour % HOURS_PER_DAY in closing_hours(resto["hours"]):
+        opportunities.append({
+            "restaurant_id": resto["id"],
+            "restaurant_name": resto["name"],
+            "type": "closing_soon",
+            "urgency": "high"
+        })
+    
+    if resto["last_hour_sales"] < SLOW_SALES_THRESHOLD:
+        opportunities.append({
+            "restaurant_id": resto["id"],
+            "restaurant_name": resto["name"],
+            "type": "slow_sales",
+            "urgency": "medium"
+        })
+        
+    for item, details in resto["inventory"].items():
+        if details["quantity"] < LOW_STOCK_THRESHOLD:
+            opportunities.append({
+                "restaurant_id": resto["id"],
+                "restaurant_name": resto["name"],
+                "type": "clear_stock",
+                "item": item,
+                "urgency": "high"
+            })
+    
+    return opportunities
+
+
+class CatalogIndex:
+    """Lookup tables over one version of the restaurant catalog.
+
+    Built once per catalog version and shared read-only by every request that
+    sees that version, so deal nodes resolve restaurants by id, name or cuisine
+    in O(1) instead of rescanning the catalog per opportunity or deal. The
+    tables hold row numbers into restaurants, so record updates (which swap a
+    row's dict) do not require a rebuild; updates never change opening hours,
+    so the closing-soon buckets stay valid too.
+    """
+
+    def __init__(self, restaurants: List[Dict[str, Any]], version: int = 0):
+        self.restaurants = restaurants
+        self.version = version
+        self.rows_by_id: Dict[str, int] = {}
+        self.rows_by_name: Dict[str, List[int]] = {}
+        self.rows_by_cuisine: Dict[str, List[int]] = {}
+        self.cuisines_by_name: Dict[str, Set[str]] = {}
+        # Normalized city per row; restaurants without one serve every location
+        self.cities: List[Optional[str]] = []
+        self.rows_by_city: Dict[Optional[str], List[int]] = {}
+        for row, resto in enumerate(restaurants):
+            # First entry wins, matching next(r for r in restaurants if ...)
+            self.rows_by_id.setdefault(resto["id"], row)
+            self.rows_by_name.setdefault(resto["name"], []).append(row)
+            self.rows_by_cuisine.setdefault(resto["cuisine"], []).append(row)
+            self.cuisines_by_name.setdefault(resto["name"], set()).add(resto["cuisine"])
+            city = normalize_city(resto.get("city"))
+            self.cities.append(city)
+            self.rows_by_city.setdefault(city, []).append(row)
+        self.rows_closing_at = closing_buckets(restaurants)
+
+    def get(self, restaurant_id: str) -> Dict[str, Any]:
+        """Restaurant with the given id; KeyError if it is not in the catalog"""
+        return self.restaurants[self.rows_by_id[restaurant_id]]
+
+    def name_has_cuisine(self, name: str, cuisine: str) -> bool:
+        """Whether any restaurant called name serves cuisine.
+
+        name may come from LLM output, so non-strings simply never match.
+        """
+        return isinstance(name, str) and cuisine in self.cuisines_by_name.get(name, ())
+
+    def closing_rows(self, current_hour: int) -> List[int]:
+        """Sorted rows whose closing-soon window covers current_hour"""
+        return self.rows_closing_at[current_hour % HOURS_PER_DAY]
+
+    @property
+    def has_cities(self) -> bool:
+        return any(city is not None for city in self.rows_by_city)
+
+    def matching_rows(self, cuisine: Optional[str] = None, location: Optional[str] = None) -> Optional[List[int]]:
+        """Sorted rows serving cuisine in location, or None when neither filter is set.
+
+        A restaurant without a city matches any location. Non-string filters
+        count as unset.
+        """
+        city = normalize_city(location)
+        if isinstance(cuisine, str) and cuisine:
+            rows = self.rows_by_cuisine.get(cuisine, [])
+            if city is None:
+                return rows
+            return [row for row in rows if self.cities[row] in (city, None)]
+        if city is None or not self.has_cities:
+            return None
+        if None not in self.rows_by_city:
+            return self.rows_by_city.get(city, [])
+        return sorted(self.rows_by_city.get(city, []) + self.rows_by_city[None])
+
+
+class CatalogColumns:
+    """NumPy arrays over a catalog for vectorized opportunity detection.
+
+    One row per restaurant (last hour sales) and one row per inventory item
+    (owning restaurant, position in its inventory, quantity, cost), so the
+    threshold rules become array comparisons. Closing-soon rows come from
+    per-hour buckets instead.
+    """
+
+    def __init__(self, restaurants: List[Dict[str, Any]], version: int = 0, revision: int = 0):
+        if np is None:
+            raise RuntimeError("NumPy is required for the columnar catalog")
+        self.restaurants = restaurants
+        self.version = version
+        self.revision = revision
+        count = len(restaurants)
+        self.ids = [r["id"] for r in restaurants]
+        self.names = [r["name"] for r in restaurants]
+        self.closing_at = [np.asarray(rows, dtype=np.int64) for rows in closing_buckets(restaurants)]
+        self.sales = np.fromiter((r["last_hour_sales"] for r in restaurants), dtype=np.float64, count=count)
+
+        owners, positions, quantities, costs, self.item_names = [], [], [], [], []
+        # A restaurant's items are contiguous: rows item_start[row]:item_start[row + 1]
+        self.item_start = [0] * (count + 1)
+        for row, resto in enumerate(restaurants):
+            self.item_start[row] = len(owners)
+            for position, (item, details) in enumerate(resto["inventory"].items()):
+                owners.append(row)
+                positions.append(position)
+                quantities.append(details["quantity"])
+                costs.append(details["cost"])
+                self.item_names.append(item)
+        self.item_owner = np.asarray(owners, dtype=np.int64)
+        self.item_position = np.asarray(positions, dtype=np.int64)
+        self.item_quantity = np.asarray(quantities, dtype=np.float64)
+        self.item_cost = np.asarray(costs, dtype=np.float64)
+        self.item_start[count] = len(owners)
+
+    def with_rows(self, rows: Set[int], revision: int) -> "CatalogColumns":
+        """Copy of these columns with the given restaurant rows re-read.
+
+        Readers holding the current object keep a consistent view; only the
+        value arrays are copied, the structural ones are shared.
+        """
+        patched = object.__new__(CatalogColumns)
+        patched.__dict__.update(self.__dict__)
+        patched.revision = revision
+        patched.sales = self.sales.copy()
+        patched.item_quantity = self.item_quantity.copy()
+        patched.item_cost = self.item_cost.copy()
+        for row in rows:
+            resto = self.restaurants[row]
+            patched.sales[row] = resto["last_hour_sales"]
+            start = self.item_start[row]
+            for offset, details in enumerate(resto["inventory"].values()):
+                patched.item_quantity[start + offset] = details["quantity"]
+                patched.item_cost[start + offset] = details["cost"]
+        return patched
+
+    def match(self, current_hour: int):
+        """Row numbers of closing-soon and slow-sales restaurants and low-stock items"""
+        closing = self.closing_at[current_hour % HOURS_PER_DAY]
+        slow = np.flatnonzero(self.sales < SLOW_SALES_THRESHOLD)
+        low_items = np.flatnonzero(self.item_quantity < LOW_STOCK_THRESHOLD)
+        return closing, slow, low_items
+
+    def detect_opportunities(self, current_hour: int) -> List[Dict[str, Any]]:
+        """Same opportunities, in the same order, as the per-restaurant dict scan"""
+        closing, slow, low_items = self.match(current_hour)
+
+        # Order by restaurant, then rule (closing, slow, stock), then inventory position
+        owners = np.concatenate([closing, slow, self.item_owner[low_items]])
+        rules = np.concatenate([
+            np.zeros(len(closing), dtype=np.int64),
+            np.ones(len(slow), dtype=np.int64),
+            np.full(len(low_items), 2, dtype=np.int64)
+        ])
+        positions = np.concatenate([
+            np.zeros(len(closing) + len(slow), dtype=np.int64),
+            self.item_position[low_items]
+        ])
+        order = np.lexsort((positions, rules, owners))
+
+        ids, names, item_names = self.ids, self.names, self.item_names
+        opportunities = [
+            {"restaurant_id": ids[row], "restaurant_name": names[row], "type": "closing_soon", "urgency": "high"}
+            for row in closing.tolist()
+        ]
+        opportunities += [
+            {"restaurant_id": ids[row], "restaurant_name": names[row], "type": "slow_sales", "urgency": "medium"}
+            for row in slow.tolist()
+        ]
+        opportunities += [
+            {"restaurant_id": ids[row], "restaurant_name": names[row], "type": "clear_stock",
+             "item": item_names[item], "urgency": "high"}
+            for row, item in zip(self.item_owner[low_items].tolist(), low_items.tolist())
+        ]
+        return [opportunities[i] for i in order.tolist()]
+
+
+class RestaurantCatalog:
+    """The current restaurant list with structural and record versions.
+
+    version identifies the restaurant list, which is fixed for the catalog's
+    lifetime, and revision is bumped on every record update. index() returns
+    the CatalogIndex for the current version and columns() the CatalogColumns
+    for the current revision, built or patched on first use after a change. Record updates are logged so
+    incremental consumers can ask which rows changed since a revision.
+
+    Updates are copy-on-write: the new record is built under a per-row stripe
+    lock and swapped into its slot, so concurrent updates to different
+    restaurants do not contend and readers never see a half-applied record or
+    take a catalog-wide lock. When a writer is given, updated restaurants are
+    handed to it for persisting.
+    """
+
+    def __init__(self, restaurants: List[Dict[str, Any]], writer=None):
+        self._lock = threading.Lock()
+        self._log_lock = threading.Lock()
+        self._stripes = [threading.Lock() for _ in range(UPDATE_LOCK_STRIPES)]
+        self.writer = writer
+        self._restaurants = list(restaurants)
+        self.version = 0
+        self.revision = 0
+        self._index: Optional[CatalogIndex] = None
+        self._columns: Optional[CatalogColumns] = None
+        self._changes: deque = deque(maxlen=CHANGE_LOG_SIZE)
+
+    def apply_updates(self, updates: List[Dict[str, Any]]) -> Tuple[int, List[Dict[str, Any]]]:
+        """Apply a batch of updates (see apply_update) keyed by "restaurant_id".
+
+        Returns (applied count, errors); an invalid update is reported and
+        skipped without affecting the rest of the batch.
+        """
+        with self._lock:
+            index, restaurants = self._index_locked(), self._restaurants
+        applied, errors, updated_ids = 0, [], []
+        try:
+            for position, update in enumerate(updates):
+                restaurant_id = update.get("restaurant_id") if isinstance(update, dict) else None
+                try:
+                    row = index.rows_by_id.get(update_restaurant_id(update))
+                    if row is None:
+                        errors.append({"index": position, "restaurant_id": restaurant_id, "error": "unknown restaurant"})
+                        continue
+                    with self._stripes[row % UPDATE_LOCK_STRIPES]:
+                        restaurants[row] = apply_update(restaurants[row], update)
+                except KeyError as e:
+                    errors.append({"index": position, "restaurant_id": restaurant_id, "error": f"unknown item {e}"})
+                    continue
+                except ValueError as e:
+                    errors.append({"index": position, "restaurant_id": restaurant_id, "error": str(e)})
+                    continue
+                with self._log_lock:
+                    self.revision += 1
+                    self._changes.append((self.revision, row))
+                applied += 1
+                updated_ids.append(restaurant_id)
+        finally:
+            # Whatever was applied must reach the store, even if the batch failed midway
+            if self.writer is not None and updated_ids:
+                self.writer.mark(updated_ids)
+        return applied, errors
+
+    def update_restaurant(self, restaurant_id: str, inventory: Optional[Dict[str, Dict[str, Any]]] = None,
+                          last_hour_sales: Optional[int] = None) -> Dict[str, Any]:
+        """Apply new item fields and/or sales to one restaurant and return its record.
+
+        Unknown ids and items raise KeyError.
+        """
+        _, errors = self.apply_updates([
+            {"restaurant_id": restaurant_id, "inventory": inventory, "last_hour_sales": last_hour_sales}
+        ])
+        if errors:
+            error = errors[0]["error"]
+            raise KeyError(error) if error.startswith("unknown") else ValueError(error)
+        return self.record(restaurant_id)
+
+    def record(self, restaurant_id: str) -> Optional[Dict[str, Any]]:
+        """Latest record for restaurant_id, or None"""
+        index = self.index()
+        row = index.rows_by_id.get(restaurant_id)
+        return None if row is None else index.restaurants[row]
+
+    def changes_since(self, revision: int) -> Optional[Set[int]]:
+        """Rows updated after revision, or None if that is older than the change log"""
+        with self._log_lock:
+            if revision == self.revision:
+                return set()
+            if revision > self.revision or not self._changes or self._changes[0][0] > revision + 1:
+                return None
+            rows = set()
+            for changed_at, row in reversed(self._changes):
+                if changed_at <= revision:
+                    break
+                rows.add(row)
+            return rows
+
+    def snapshot(self):
+        """(index, revision) read together"""
+        with self._lock:
+            with self._log_lock:
+                return self._index_locked(), self.revision
+
+    def index(self) -> CatalogIndex:
+        with self._lock:
+            return self._index_locked()
+
+    def _index_locked(self) -> CatalogIndex:
+        if self._index is None or self._index.version != self.version:
+            self._index = CatalogIndex(self._restaurants, self.version)
+        return self._index
+
+    def columns(self) -> CatalogColumns:
+        """Columnar view at the current revision (requires NumPy)"""
+        with self._lock:
+            with self._log_lock:
+                revision = self.revision
+            columns = self._columns
+            if columns is None or columns.version != self.version:
+                columns = CatalogColumns(self._restaurants, self.version, revision)
+            elif columns.revision != revision:
+                rows = self.changes_since(columns.revision)
+                if rows is None:
+                    columns = CatalogColumns(self._restaurants, self.version, revision)
+                else:
+                    columns = columns.with_rows(rows, revision)
+            self._columns = columns
+            return columns
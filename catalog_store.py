@@ -0,0 +1,273 @@
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from caching import DaemonWorker, thread_connection
+from catalog import (
+    HOURS_PER_DAY, LOW_STOCK_THRESHOLD, SLOW_SALES_THRESHOLD, apply_update, closing_hours, normalize_city,
+    update_restaurant_id
+)
+
+# Inventory is stored as JSON per restaurant, so a load is one indexed scan;
+# min_quantity mirrors its lowest quantity for the low-stock rule and
+# closing_hours holds one row per hour of each restaurant's closing window
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS restaurants (
+    row_id INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    cuisine TEXT NOT NULL,
+    city TEXT,
+    city_key TEXT,
+    open_hour NUMERIC NOT NULL,
+    close_hour NUMERIC NOT NULL,
+    rating REAL,
+    last_hour_sales NUMERIC NOT NULL,
+    inventory TEXT NOT NULL,
+    min_quantity NUMERIC
+);
+CREATE INDEX IF NOT EXISTS idx_restaurants_cuisine_city ON restaurants (cuisine, city_key);
+CREATE INDEX IF NOT EXISTS idx_restaurants_city ON restaurants (city_key);
+CREATE TABLE IF NOT EXISTS closing_hours (
+    hour INTEGER NOT NULL,
+    row_id INTEGER NOT NULL,
+    PRIMARY KEY (hour, row_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_restaurants_sales ON restaurants (last_hour_sales);
+CREATE INDEX IF NOT EXISTS idx_restaurants_min_quantity ON restaurants (min_quantity);
+"""
+
+
+def min_quantity(inventory: Dict[str, Dict[str, Any]]) -> Optional[float]:
+    return min((details["quantity"] for details in inventory.values()), default=None)
+
+
+class CatalogStore:
+    """SQLite catalog of restaurants and their inventory.
+
+    Rows keep the catalog order and come back in the same dict shape as the
+    seed data. Cuisine and city are indexed, and closing windows are bucketed
+    by hour, so requests can load just the restaurants they need. The database runs in WAL mode, so
+    gunicorn workers read it concurrently through the shared OS page cache
+    instead of each holding its own copy.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            # Stores created before the closing_hours table get it filled once
+            if not conn.execute("SELECT 1 FROM closing_hours LIMIT 1").fetchone():
+                self._index_closing_hours(conn)
+
+    def _connect(self) -> sqlite3.Connection:
+        return thread_connection(self._local, self.path)
+
+    def seed(self, restaurants: Iterable[Dict[str, Any]]) -> int:
+        """Insert restaurants if the store is empty; returns how many were added"""
+        with self._connect() as conn:
+            # Take the write lock first so concurrently starting workers seed once
+            conn.execute("BEGIN IMMEDIATE")
+            if conn.execute("SELECT 1 FROM restaurants LIMIT 1").fetchone():
+                return 0
+            return self._insert(conn, restaurants)
+
+    def replace_all(self, restaurants: Iterable[Dict[str, Any]]) -> int:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM restaurants")
+            conn.execute("DELETE FROM closing_hours")
+            return self._insert(conn, restaurants)
+
+    def _insert(self, conn: sqlite3.Connection, restaurants: Iterable[Dict[str, Any]]) -> int:
+        cursor = conn.executemany(
+            "INSERT INTO restaurants (id, name, cuisine, city, city_key, open_hour, close_hour, "
+            "rating, last_hour_sales, inventory, min_quantity) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(resto["id"], resto["name"], resto["cuisine"], resto.get("city"), normalize_city(resto.get("city")),
+              resto["hours"]["open"], resto["hours"]["close"], resto.get("rating"), resto["last_hour_sales"],
+              json.dumps(resto["inventory"]), min_quantity(resto["inventory"]))
+             for resto in restaurants]
+        )
+        self._index_closing_hours(conn)
+        return cursor.rowcount
+
+    def _index_closing_hours(self, conn: sqlite3.Connection) -> None:
+        """Bucket restaurants missing from closing_hours by the hours of their closing window"""
+        rows = conn.execute(
+            "SELECT row_id, open_hour, close_hour FROM restaurants "
+            "WHERE row_id NOT IN (SELECT row_id FROM closing_hours)"
+        ).fetchall()
+        conn.executemany(
+            "INSERT INTO closing_hours (hour, row_id) VALUES (?, ?)",
+            [(hour, row_id) for row_id, open_hour, close_hour in rows
+             for hour in closing_hours({"open": open_hour, "close": close_hour})]
+        )
+
+    def load(self, cuisine: Optional[str] = None, location: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Restaurants serving cuisine in location (all when unset), in catalog order.
+
+        As in CatalogIndex.matching_rows, a restaurant without a city matches
+        any location.
+        """
+        where, params = self._filters(cuisine, location)
+        return self._select(where, params)
+
+    def opportunity_candidates(self, current_hour: int, cuisine: Optional[str] = None,
+                               location: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Filtered restaurants that can have a deal opportunity at current_hour.
+
+        The rules are pushed into indexed lookups (the hour's closing bucket and
+        sales / stock range conditions), so only closing-soon, slow-selling or
+        low-stock restaurants are read.
+        """
+        where, params = self._filters(cuisine, location)
+        where.append(
+            "(row_id IN (SELECT row_id FROM closing_hours WHERE hour = ?) "
+            "OR last_hour_sales < ? OR min_quantity < ?)"
+        )
+        params += [current_hour % HOURS_PER_DAY, SLOW_SALES_THRESHOLD, LOW_STOCK_THRESHOLD]
+        return self._select(where, params)
+
+    def write_records(self, restaurants: List[Dict[str, Any]]) -> None:
+        """Persist the inventory and sales of already-updated restaurant records"""
+        with self._connect() as conn:
+            conn.executemany(
+                "UPDATE restaurants SET inventory = ?, min_quantity = ?, last_hour_sales = ? WHERE id = ?",
+                [(json.dumps(resto["inventory"]), min_quantity(resto["inventory"]),
+                  resto["last_hour_sales"], resto["id"]) for resto in restaurants]
+            )
+
+    def apply_updates(self, updates: List[Dict[str, Any]]) -> Tuple[int, List[Dict[str, Any]]]:
+        """Apply a batch of updates (see catalog.apply_update) in one transaction.
+
+        Used when no in-memory catalog is kept; returns (applied count, errors)
+        like RestaurantCatalog.apply_updates.
+        """
+        applied, errors = 0, []
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            for position, update in enumerate(updates):
+                restaurant_id = update.get("restaurant_id") if isinstance(update, dict) else None
+                try:
+                    row = conn.execute(
+                        "SELECT inventory, last_hour_sales FROM restaurants WHERE id = ?",
+                        (update_restaurant_id(update),)
+                    ).fetchone()
+                    if row is None:
+                        errors.append({"index": position, "restaurant_id": restaurant_id, "error": "unknown restaurant"})
+                        continue
+                    resto = apply_update(
+                        {"id": restaurant_id, "inventory": json.loads(row[0]), "last_hour_sales": row[1]}, update
+                    )
+                except KeyError as e:
+                    errors.append({"index": position, "restaurant_id": restaurant_id, "error": f"unknown item {e}"})
+                    continue
+                except ValueError as e:
+                    errors.append({"index": position, "restaurant_id": restaurant_id, "error": str(e)})
+                    continue
+                conn.execute(
+                    "UPDATE restaurants SET inventory = ?, min_quantity = ?, last_hour_sales = ? WHERE id = ?",
+                    (json.dumps(resto["inventory"]), min_quantity(resto["inventory"]),
+                     resto["last_hour_sales"], restaurant_id)
+                )
+                applied += 1
+        return applied, errors
+
+    def _filters(self, cuisine: Optional[str], location: Optional[str]):
+        where, params = [], []
+        if isinstance(cuisine, str) and cuisine:
+            where.append("cuisine = ?")
+            params.append(cuisine)
+        city = normalize_city(location)
+        if city is not None:
+            where.append("(city_key = ? OR city_key IS NULL)")
+            params.append(city)
+        return where, params
+
+    def _select(self, where: List[str], params: List[Any]) -> List[Dict[str, Any]]:
+        sql = (
+            "SELECT id, name, cuisine, city, open_hour, close_hour, rating, last_hour_sales, inventory "
+            f"FROM restaurants {'WHERE ' + ' AND '.join(where) if where else ''} ORDER BY row_id"
+        )
+        restaurants = []
+        loads = json.loads
+        for rid, name, cuisine, city, open_hour, close_hour, rating, sales, inventory in \
+                self._connect().execute(sql, params):
+            resto = {
+                "id": rid,
+                "name": name,
+                "cuisine": cuisine,
+                "inventory": loads(inventory),
+                "hours": {"open": open_hour, "close": close_hour},
+                "rating": rating,
+                "last_hour_sales": sales
+            }
+            if city is not None:
+                resto["city"] = city
+            restaurants.append(resto)
+        return restaurants
+
+
+class CatalogWriter:
+    """Write-behind persistence of in-memory catalog updates.
+
+    Updated restaurant ids are collected and flushed to the store on a
+    background thread every interval_seconds, each flush writing the latest
+    record of every pending restaurant in one transaction. Flushes are
+    serialized and always read the current record, so the store never ends up
+    behind an earlier write.
+    """
+
+    def __init__(self, store: CatalogStore, read_record: Callable[[str], Optional[Dict[str, Any]]],
+                 interval_seconds: float = 0.5):
+        self.store = store
+        self._read_record = read_record
+        self.interval_seconds = interval_seconds
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._pending = set()
+        self._worker = DaemonWorker(self._run, "catalog-writer")
+        self._stats = {"flushes": 0, "records_written": 0, "flush_failures": 0}
+
+    def mark(self, restaurant_ids: Iterable[str]) -> None:
+        with self._cond:
+            self._pending.update(restaurant_ids)
+            self._worker.ensure_started()
+            self._cond.notify()
+
+    def flush(self) -> int:
+        """Write all pending restaurants now; returns how many were written"""
+        with self._flush_lock:
+            with self._cond:
+                pending, self._pending = self._pending, set()
+            records = [record for record in map(self._read_record, pending) if record is not None]
+            if not records:
+                return 0
+            try:
+                self.store.write_records(records)
+            except sqlite3.Error as e:
+                print(f"Catalog flush failed: {e}")
+                with self._cond:
+                    self._pending.update(pending)
+                    self._stats["flush_failures"] += 1
+                return 0
+            with self._cond:
+                self._stats["flushes"] += 1
+                self._stats["records_written"] += len(records)
+            return len(records)
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            stats = dict(self._stats)
+            stats["pending"] = len(self._pending)
+        return stats
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+            self.flush()
+            time.sleep(self.interval_seconds)
@@ -0,0 +1,134 @@
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, FrozenSet, Hashable, List, Optional, Tuple
+
+from caching import DaemonWorker
+
+EMPTY_INSIGHTS = {"critical": [], "creative_deals": [], "marketing": []}
+
+
+def opportunity_signature(opportunities: List[Dict[str, Any]]) -> FrozenSet[Tuple]:
+    return frozenset((o["restaurant_id"], o["type"], o.get("item")) for o in opportunities)
+
+
+class _InsightsEntry:
+    def __init__(self):
+        self.insights: Optional[Dict[str, Any]] = None
+        self.built_at: Optional[float] = None
+        self.signature: FrozenSet[Tuple] = frozenset()
+        self.latest: List[Dict[str, Any]] = []
+        self.last_read = 0.0
+
+
+class InsightsRefresher:
+    """Keeps LLM deal insights fresh on a background thread.
+
+    Readers get the latest insights for their key immediately (empty ones
+    until the first generation finishes) together with their age. A refresh
+    is queued when a key has none yet or when its opportunities differ from
+    those the insights were generated from by at least change_threshold
+    (share of the union that changed). Keys read since their last refresh are
+    also regenerated every interval_seconds. A single worker runs the queued
+    refreshes one at a time. Reads without opportunities get empty insights
+    and never create a key; at most max_keys keys are kept, evicting the
+    least recently read.
+    """
+
+    def __init__(self, generate: Callable[[List[Dict[str, Any]], datetime], Dict[str, Any]],
+                 interval_seconds: float = 300, change_threshold: float = 0.2, max_keys: int = 256):
+        self._generate = generate
+        self.interval_seconds = interval_seconds
+        self.change_threshold = change_threshold
+        self.max_keys = max_keys
+        self._cond = threading.Condition()
+        self._entries: Dict[Hashable, _InsightsEntry] = {}
+        self._pending: Dict[Hashable, List[Dict[str, Any]]] = {}
+        self._worker = DaemonWorker(self._run, "deal-insights")
+        self._stats = {"reads": 0, "refreshes": 0, "refresh_failures": 0, "change_triggered": 0, "evictions": 0}
+
+    def read(self, key: Hashable, opportunities: List[Dict[str, Any]]) -> Tuple[Dict[str, Any], Optional[float]]:
+        """(insights, age in seconds or None if none were generated yet) for key"""
+        now = time.time()
+        with self._cond:
+            self._stats["reads"] += 1
+            if not opportunities:
+                # Nothing to analyze: no LLM call and no entry to keep refreshing
+                return EMPTY_INSIGHTS, None
+            self._worker.ensure_started()
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _InsightsEntry()
+            entry.latest = opportunities
+            entry.last_read = now
+            self._evict()
+            if key in self._pending:
+                # Already queued: refresh from the newest opportunities, without another wakeup
+                self._pending[key] = opportunities
+            elif entry.insights is None:
+                self._queue(key, opportunities)
+            elif self._changed_materially(entry, opportunities):
+                self._stats["change_triggered"] += 1
+                self._queue(key, opportunities)
+            if entry.insights is None:
+                return EMPTY_INSIGHTS, None
+            return entry.insights, round(now - entry.built_at, 3)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            stats = dict(self._stats)
+            stats["keys"] = len(self._entries)
+            stats["pending"] = len(self._pending)
+        return stats
+
+    def _evict(self) -> None:
+        while len(self._entries) > self.max_keys:
+            key = min(self._entries, key=lambda k: self._entries[k].last_read)
+            del self._entries[key]
+            self._pending.pop(key, None)
+            self._stats["evictions"] += 1
+
+    def _changed_materially(self, entry: _InsightsEntry, opportunities: List[Dict[str, Any]]) -> bool:
+        signature = opportunity_signature(opportunities)
+        union = len(signature | entry.signature)
+        return bool(union) and len(signature ^ entry.signature) / union >= self.change_threshold
+
+    def _queue(self, key: Hashable, opportunities: List[Dict[str, Any]]) -> None:
+        self._pending[key] = opportunities
+        self._cond.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                if not self._pending:
+                    self._cond.wait(timeout=self.interval_seconds)
+                    self._queue_scheduled()
+                if not self._pending:
+                    continue
+                key = next(iter(self._pending))
+                opportunities = self._pending.pop(key)
+            self._refresh(key, opportunities)
+
+    def _queue_scheduled(self) -> None:
+        now = time.time()
+        for key, entry in self._entries.items():
+            if entry.built_at is not None and now - entry.built_at >= self.interval_seconds \
+                    and entry.last_read >= entry.built_at:
+                self._pending.setdefault(key, entry.latest)
+
+    def _refresh(self, key: Hashable, opportunities: List[Dict[str, Any]]) -> None:
+        try:
+            insights = self._generate(opportunities, datetime.now())
+        except Exception as e:
+            print(f"Deal insights refresh failed: {e}")
+            with self._cond:
+                self._stats["refresh_failures"] += 1
+            return
+        with self._cond:
+            entry = self._entries.get(key)
+            if entry is None:  # evicted while refreshing
+                return
+            entry.insights = insights
+            entry.built_at = time.time()
+            entry.signature = opportunity_signature(opportunities)
+            self._stats["refreshes"] += 1
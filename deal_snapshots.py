@@ -0,0 +1,83 @@
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from catalog import CatalogIndex, RestaurantCatalog
+
+
+class DealSnapshot:
+    """Rule-based opportunities and deals for one hour and catalog revision.
+
+    deals[i] is the deal for opportunities[i]; both are in catalog row order,
+    so each restaurant's entries form one span that for_rows() can slice out.
+    """
+
+    def __init__(self, hour: int, version: int, revision: int, catalog: CatalogIndex,
+                 opportunities: List[Dict[str, Any]], deals: List[Dict[str, Any]]):
+        self.hour = hour
+        self.version = version
+        self.revision = revision
+        self.opportunities = opportunities
+        self.deals = deals
+        self.built_at = time.time()
+        self.spans: Dict[int, Tuple[int, int]] = {}
+        for position, opp in enumerate(opportunities):
+            row = catalog.rows_by_id[opp["restaurant_id"]]
+            start, _ = self.spans.get(row, (position, position))
+            self.spans[row] = (start, position + 1)
+
+    def for_rows(self, rows: List[int]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Opportunities and deals of the given (sorted) rows only"""
+        opportunities, deals = [], []
+        for row in rows:
+            span = self.spans.get(row)
+            if span is not None:
+                opportunities += self.opportunities[span[0]:span[1]]
+                deals += self.deals[span[0]:span[1]]
+        return opportunities, deals
+
+    @property
+    def key(self) -> Tuple[int, int, int]:
+        return self.hour, self.version, self.revision
+
+
+class DealSnapshotCache:
+    """Materializes the rule-based deals once per (hour, catalog revision).
+
+    Apart from inventory and sales, the rules only depend on the hour, so
+    every request in the same hour against an unchanged catalog shares one
+    snapshot. The next read after an hour rollover or a catalog change builds
+    a new one; concurrent readers wait for that single build. Snapshot lists
+    are shared and must not be mutated.
+    """
+
+    def __init__(self, catalog: RestaurantCatalog,
+                 build: Callable[[CatalogIndex, int], Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]]):
+        self.catalog = catalog
+        self._build = build
+        self._lock = threading.Lock()
+        self._snapshot: Optional[DealSnapshot] = None
+        self._stats = {"hits": 0, "builds": 0}
+
+    def get(self, current_hour: int) -> DealSnapshot:
+        with self._lock:
+            index, revision = self.catalog.snapshot()
+            snapshot = self._snapshot
+            if snapshot is not None and snapshot.key == (current_hour, index.version, revision):
+                self._stats["hits"] += 1
+                return snapshot
+            opportunities, deals = self._build(index, current_hour)
+            self._snapshot = DealSnapshot(current_hour, index.version, revision, index, opportunities, deals)
+            self._stats["builds"] += 1
+            return self._snapshot
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            snapshot = self._snapshot
+        if snapshot is not None:
+            stats["hour"] = snapshot.hour
+            stats["revision"] = snapshot.revision
+            stats["deals"] = len(snapshot.deals)
+            stats["age_seconds"] = round(time.time() - snapshot.built_at, 3)
+        return stats
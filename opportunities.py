@@ -0,0 +1,115 @@
+import bisect
+import threading
+from itertools import chain
+from typing import Any, Dict, List, Optional, Set
+
+from catalog import CatalogIndex, RestaurantCatalog, restaurant_opportunities
+
+
+class OpportunityTracker:
+    """Keeps the catalog's deal opportunities current without full rescans.
+
+    Opportunities are stored per restaurant row. A read re-evaluates only the
+    rows updated since the previous read (from the catalog's change log) and,
+    when the hour changed, the rows whose closing-soon rule flips between the
+    two hours. A replaced catalog or an overflowed change log falls back to a
+    full recompute. full_recompute() and verify() rescan everything so the
+    incremental state can be checked against it.
+    """
+
+    def __init__(self, catalog: RestaurantCatalog, check_every: int = 0):
+        self.catalog = catalog
+        self.check_every = check_every
+        self._lock = threading.Lock()
+        self._version: Optional[int] = None
+        self._revision = 0
+        self._hour: Optional[int] = None
+        self._by_row: Dict[int, List[Dict[str, Any]]] = {}
+        self._rows: List[int] = []  # sorted keys of _by_row
+        self._result: Optional[List[Dict[str, Any]]] = None
+        self._reads = 0
+        self._stats = {"full_recomputes": 0, "incremental_reads": 0, "rows_reevaluated": 0, "mismatches": 0}
+
+    def opportunities(self, current_hour: int) -> List[Dict[str, Any]]:
+        """Opportunities for the current catalog, in catalog order.
+
+        The list is shared with other readers until the next change and must
+        not be mutated.
+        """
+        with self._lock:
+            result = self._read(current_hour)
+            self._reads += 1
+            if self.check_every and self._reads % self.check_every == 0:
+                expected = self.full_recompute(current_hour)
+                if result != expected:
+                    self._stats["mismatches"] += 1
+                    self._version = None
+                    return expected
+            return result
+
+    def full_recompute(self, current_hour: int) -> List[Dict[str, Any]]:
+        """Opportunities from a full scan of the catalog, ignoring tracked state"""
+        index = self.catalog.index()
+        return [opp for resto in index.restaurants for opp in restaurant_opportunities(resto, current_hour)]
+
+    def verify(self, current_hour: int) -> bool:
+        """Compare tracked opportunities with a full recompute; resync on mismatch"""
+        with self._lock:
+            if self._read(current_hour) == self.full_recompute(current_hour):
+                return True
+            self._stats["mismatches"] += 1
+            self._version = None
+            return False
+
+    def _read(self, current_hour: int) -> List[Dict[str, Any]]:
+        index, revision = self.catalog.snapshot()
+        dirty = None
+        if index.version == self._version:
+            dirty = self.catalog.changes_since(self._revision)
+        if dirty is None:
+            self._rebuild(index, current_hour)
+        else:
+            if current_hour != self._hour:
+                dirty |= self._closing_flips(index, self._hour, current_hour)
+            # Patch the sorted row list for small batches; re-sort it for big ones
+            patch_rows = len(dirty) <= 64
+            for row in dirty:
+                found = restaurant_opportunities(index.restaurants[row], current_hour)
+                if found:
+                    if patch_rows and row not in self._by_row:
+                        bisect.insort(self._rows, row)
+                    self._by_row[row] = found
+                elif self._by_row.pop(row, None) is not None and patch_rows:
+                    del self._rows[bisect.bisect_left(self._rows, row)]
+            if not patch_rows:
+                self._rows = sorted(self._by_row)
+            if dirty:
+                self._result = None
+            self._stats["incremental_reads"] += 1
+            self._stats["rows_reevaluated"] += len(dirty)
+        self._revision, self._hour = revision, current_hour
+
+        if self._result is None:
+            self._result = list(chain.from_iterable(map(self._by_row.__getitem__, self._rows)))
+        return self._result
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["restaurants_with_opportunities"] = len(self._by_row)
+        return stats
+
+    def _rebuild(self, index: CatalogIndex, current_hour: int) -> None:
+        self._by_row = {}
+        for row, resto in enumerate(index.restaurants):
+            found = restaurant_opportunities(resto, current_hour)
+            if found:
+                self._by_row[row] = found
+        self._rows = sorted(self._by_row)
+        self._version = index.version
+        self._result = None
+        self._stats["full_recomputes"] += 1
+
+    def _closing_flips(self, index: CatalogIndex, old_hour: int, new_hour: int) -> Set[int]:
+        """Rows whose closing-soon rule differs between the two hours"""
+        return set(index.closing_rows(old_hour)).symmetric_difference(index.closing_rows(new_hour))
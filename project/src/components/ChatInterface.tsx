@@ -1,5 +1,6 @@
 import React, { useState, useRef, useEffect } from 'react';
 import { Send, MessageCircle, Bot, User, Loader2, Sparkles, AlertCircle } from 'lucide-react';
+import { readSseStream } from '../sse';
 
 interface ChatInterfaceProps {
   location: string;
@@ -59,8 +60,28 @@ const ChatInterface: React.FC<ChatInterfaceProps> = ({ location }) => {
     setInputText('');
     setIsTyping(true);
 
+    const botMessageId = (Date.now() + 1).toString();
+    const appendToBotMessage = (chunk: string) => {
+      setMessages(prev => {
+        if (!prev.some(message => message.id === botMessageId)) {
+          const botMessage: Message = {
+            id: botMessageId,
+            text: chunk,
+            sender: 'bot',
+            timestamp: new Date(),
+            error: false
+          };
+          return [...prev, botMessage];
+        }
+        return prev.map(message =>
+          message.id === botMessageId ? { ...message, text: message.text + chunk } : message
+        );
+      });
+    };
+
     try {
-      const response = await fetch(`${API_BASE_URL}/api/food/chat`, {
+      // Stream the reply so text shows up as soon as the backend produces it
+      const response = await fetch(`${API_BASE_URL}/api/food/chat/stream`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
@@ -71,26 +92,24 @@ const ChatInterface: React.FC<ChatInterfaceProps> = ({ location }) => {
         }),
       });
 
-      const data = await response.json();
-      
-      if (!response.ok) {
-        throw new Error(data.error || 'Failed to get response');
+      if (!response.ok || !response.body) {
+        throw new Error('Failed to get response');
       }
 
-      const botMessage: Message = {
-        id: (Date.now() + 1).toString(),
-        text: data.response,
-        sender: 'bot',
-        timestamp: new Date(),
-        error: false
-      };
-
-      setDemoMode(data.demo_mode || false);
-      setMessages(prev => [...prev, botMessage]);
+      await readSseStream(response.body, (event, payload) => {
+        if (event === 'delta') {
+          setIsTyping(false);
+          appendToBotMessage(payload.text);
+        } else if (event === 'done') {
+          setDemoMode(payload.demo_mode || false);
+        } else if (event === 'error') {
+          throw new Error(payload.error || 'Failed to get response');
+        }
+      });
     } catch (error) {
       console.error('Chat error:', error);
       const botMessage: Message = {
-        id: (Date.now() + 1).toString(),
+        id: (Date.now() + 2).toString(),
         text: "I'm having trouble connecting to the food assistant. Please try again later.",
         sender: 'bot',
         timestamp: new Date(),
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { 
   Percent, 
   Clock, 
@@ -53,22 +53,33 @@ const DealAgent: React.FC<DealAgentProps> = ({ location }) => {
   const [activeFilters, setActiveFilters] = useState<string[]>([]);
   const [error, setError] = useState<string | null>(null);
   const [lastUpdated, setLastUpdated] = useState<string | null>(null);
+  // ETag of the deals currently shown; the server answers 304 while they are unchanged
+  const dealsEtag = useRef<string | null>(null);
 
   const fetchDeals = async () => {
     setIsLoading(true);
     setError(null);
     
     try {
+      const headers: Record<string, string> = {
+        'Content-Type': 'application/json',
+      };
+      if (dealsEtag.current) {
+        headers['If-None-Match'] = dealsEtag.current;
+      }
       const response = await fetch(`${API_BASE_URL}/api/deals/recommendations`, {
         method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
+        headers,
         body: JSON.stringify({
           location: location
         }),
       });
 
+      if (response.status === 304) {
+        setLastUpdated(new Date().toISOString());
+        return;
+      }
+
       if (!response.ok) {
         throw new Error(`API request failed with status ${response.status}`);
       }
@@ -84,9 +95,11 @@ const DealAgent: React.FC<DealAgentProps> = ({ location }) => {
       setHighPriorityCount(data.high_priority_count || 0);
       setAverageRating(data.average_rating || 0);
       setLastUpdated(data.timestamp || new Date().toISOString());
+      dealsEtag.current = response.headers.get('ETag');
       
     } catch (err) {
       console.error('Error fetching deals:', err);
+      dealsEtag.current = null;
       setError(err instanceof Error ? err.message : 'Failed to load deals');
       // Fallback to mock data if API fails
       setDeals(getMockDeals());
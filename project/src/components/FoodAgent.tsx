@@ -14,6 +14,7 @@ import {
   Loader2,
   PartyPopper  // Added for festivals
 } from 'lucide-react';
+import { readSseStream } from '../sse';
 
 interface FoodAgentProps {
   location: string;
@@ -47,19 +48,20 @@ interface Recommendation {
   meal_type: string;
 }
 
-interface ApiResponse {
-  recommendations: Recommendation[];
-  context: {
-    weather: WeatherData;
-    location: string;
-    festivals?: {
-      festivals: Festival[];
-    };
-    current_month?: string;
-  };
-  errors?: string[];
-  demo_mode?: boolean;
-}
+// Events emitted by /api/food/recommendations/stream
+type StreamEvent =
+  | {
+      event: 'context';
+      data: {
+        weather?: WeatherData;
+        festivals?: { festivals: Festival[] };
+        current_month?: string;
+        demo_mode?: boolean;
+      };
+    }
+  | { event: 'recommendation'; data: { index: number; recommendation: Recommendation } }
+  | { event: 'explanation'; data: { index: number; explanation: string } }
+  | { event: 'done'; data: { errors?: string[]; demo_mode?: boolean } };
 
 const API_BASE_URL = 'http://localhost:5000';
 
@@ -73,12 +75,45 @@ const FoodAgent: React.FC<FoodAgentProps> = ({ location }) => {
   const [errors, setErrors] = useState<string[]>([]);
   const [demoMode, setDemoMode] = useState(false);
 
+  const handleStreamEvent = (message: StreamEvent) => {
+    switch (message.event) {
+      case 'context':
+        setWeatherData(message.data.weather || null);
+        setFestivals(message.data.festivals?.festivals || []);
+        setCurrentMonth(message.data.current_month || '');
+        setDemoMode(message.data.demo_mode || false);
+        break;
+      case 'recommendation':
+        setRecommendations(prev => {
+          const next = [...prev];
+          next[message.data.index] = message.data.recommendation;
+          return next;
+        });
+        break;
+      case 'explanation':
+        setRecommendations(prev =>
+          prev.map((rec, index) =>
+            index === message.data.index ? { ...rec, explanation: message.data.explanation } : rec
+          )
+        );
+        break;
+      case 'done':
+        setDemoMode(message.data.demo_mode || false);
+        if (message.data.errors && message.data.errors.length > 0) {
+          setErrors(message.data.errors);
+        }
+        break;
+    }
+  };
+
   const fetchRecommendations = async () => {
     setIsLoading(true);
     setErrors([]);
+    setRecommendations([]);
     
     try {
-      const response = await fetch(`${API_BASE_URL}/api/food/recommendations`, {
+      // Stream results so context and dishes render as soon as each stage finishes
+      const response = await fetch(`${API_BASE_URL}/api/food/recommendations/stream`, {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
@@ -89,21 +124,13 @@ const FoodAgent: React.FC<FoodAgentProps> = ({ location }) => {
         }),
       });
 
-      if (!response.ok) {
+      if (!response.ok || !response.body) {
         throw new Error(`API request failed with status ${response.status}`);
       }
 
-      const data: ApiResponse = await response.json();
-      
-      setRecommendations(data.recommendations || []);
-      setWeatherData(data.context?.weather || null);
-      setFestivals(data.context?.festivals?.festivals || []);
-      setCurrentMonth(data.context?.current_month || '');
-      setDemoMode(data.demo_mode || false);
-      
-      if (data.errors && data.errors.length > 0) {
-        setErrors(data.errors);
-      }
+      await readSseStream(response.body, (event, data) =>
+        handleStreamEvent({ event, data } as StreamEvent)
+      );
     } catch (error) {
       console.error('Error fetching recommendations:', error);
       setErrors([`Failed to load recommendations: ${error.message}`]);
@@ -0,0 +1,36 @@
+// Server-Sent Events over fetch(): EventSource cannot send POST bodies, so the
+// streaming endpoints are read from the response body instead
+
+/** Read an SSE response body, calling onEvent with each frame's event and parsed JSON data */
+export async function readSseStream(
+  body: ReadableStream<Uint8Array>,
+  onEvent: (event: string, data: any) => void
+): Promise<void> {
+  const reader = body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    // Server-Sent Events frames are separated by a blank line
+    let boundary = buffer.indexOf('\n\n');
+    while (boundary !== -1) {
+      const frame = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      boundary = buffer.indexOf('\n\n');
+
+      let event = '';
+      let data = '';
+      for (const line of frame.split('\n')) {
+        if (line.startsWith('event: ')) event = line.slice(7);
+        else if (line.startsWith('data: ')) data += line.slice(6);
+      }
+      if (event && data) {
+        onEvent(event, JSON.parse(data));
+      }
+    }
+  }
+}
@@ -0,0 +1,55 @@
+import asyncio
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+scratch = tempfile.mkdtemp()
+os.environ.setdefault("CATALOG_DB_PATH", os.path.join(scratch, "catalog.db"))
+os.environ.setdefault("FESTIVAL_CACHE_PATH", os.path.join(scratch, "festival_cache.db"))
+
+import agent_01
+import app as app_module
+
+
+async def fake_stream_reply(self, user_message, location):
+    """Two reply parts with a counted LLM call in between, no network"""
+    yield "greeting\n"
+    agent_01.count_llm_call()
+    await asyncio.sleep(0)
+    yield "dish\n"
+
+
+def test_stream_through_iter_async_is_cached(monkeypatch):
+    monkeypatch.setattr(agent_01.FoodChatBot, "_stream_reply", fake_stream_reply)
+    bot = agent_01.FoodChatBot()
+    message, location = "stream test: something spicy", "Testville"
+
+    chunks = list(app_module.iter_async(bot.stream_chat_about_food(message, location)))
+
+    assert "".join(chunks) == "greeting\ndish\n"
+    assert agent_01.chat_cache.get(message, bot._cache_scope(location)) == "greeting\ndish\n"
+    assert agent_01.llm_call_counter.get() is None
+
+
+def test_chat_stream_endpoint_ends_with_done(monkeypatch):
+    monkeypatch.setattr(agent_01.FoodChatBot, "_stream_reply", fake_stream_reply)
+    monkeypatch.setattr(app_module.config, "is_demo_mode", lambda: False)
+    client = app_module.app.test_client()
+
+    body = client.post(
+        "/api/food/chat/stream", json={"message": "endpoint test: something sweet", "location": "Elsewhere"}
+    ).get_data(as_text=True)
+
+    assert "event: error" not in body
+    assert body.endswith('event: done\ndata: {"demo_mode": false}\n\n')
+
+
+def test_stream_endpoints_reject_non_object_bodies():
+    client = app_module.app.test_client()
+
+    for path in ("/api/food/recommendations/stream", "/api/food/chat/stream"):
+        for body in ([1, 2], "text", 5):
+            response = client.post(path, json=body)
+            assert response.status_code == 400
+            assert response.get_json() == {"error": "request body must be a JSON object"}
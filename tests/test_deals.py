@@ -0,0 +1,64 @@
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+scratch = tempfile.mkdtemp()
+os.environ.setdefault("CATALOG_DB_PATH", os.path.join(scratch, "catalog.db"))
+os.environ.setdefault("FESTIVAL_CACHE_PATH", os.path.join(scratch, "festival_cache.db"))
+
+import pytest
+
+import agent_02
+import app as app_module
+
+
+class OfflineCohere:
+    def generate(self, **kwargs):
+        raise RuntimeError("offline test")
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(agent_02, "co", OfflineCohere())
+    monkeypatch.setattr(agent_02, "DEAL_INSIGHTS_MODE", "inline")
+    monkeypatch.setattr(app_module, "deal_agent", agent_02.DealAgent())
+    return app_module.app.test_client()
+
+
+@pytest.mark.parametrize("body, error", [
+    ({"cuisine": ["Indian"]}, "cuisine must be a string"),
+    ({"cuisine": {"name": "Indian"}}, "cuisine must be a string"),
+    ({"location": 5}, "location must be a string"),
+    ({"location": ["Mumbai"]}, "location must be a string"),
+])
+def test_deals_reject_non_string_filters(client, body, error):
+    response = client.post("/api/deals/recommendations", json=body)
+
+    assert response.status_code == 400
+    assert response.get_json() == {"error": error}
+
+
+def test_catalog_filters_ignore_non_string_values():
+    catalog = agent_02.DealAgent().catalog.index()
+
+    assert catalog.matching_rows(["Indian"], 5) is None
+    assert catalog.matching_rows(["Indian"], "Mumbai") == catalog.matching_rows(None, "Mumbai")
+
+
+def test_non_finite_and_negative_updates_are_rejected(client):
+    restaurant = app_module.deal_agent.catalog.index().restaurants[0]
+    item = next(iter(restaurant["inventory"]))
+    updates = [
+        {"restaurant_id": restaurant["id"], "inventory": {item: {"quantity": float("nan")}}},
+        {"restaurant_id": restaurant["id"], "inventory": {item: {"cost": float("inf")}}},
+        {"restaurant_id": restaurant["id"], "last_hour_sales": -5},
+        {"restaurant_id": restaurant["id"], "inventory": {item: {"quantity": -1}}},
+    ]
+
+    response = client.post("/api/deals/inventory", json={"updates": updates})
+
+    assert response.status_code == 422
+    assert [error["index"] for error in response.get_json()["errors"]] == [0, 1, 2, 3]
+    assert app_module.deal_agent.catalog.index().restaurants[0] == restaurant
+    assert client.post("/api/deals/recommendations", json={"location": "Mumbai"}).status_code == 200